@@ -0,0 +1,21 @@
+"""Loads the Home Assistant free modules of the integration without importing the package."""
+
+import importlib.util
+import os
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+COMPONENT = os.path.join(HERE, '..', 'custom_components', 'cez_hdo')
+
+
+def load(name):
+    """Load custom_components/cez_hdo/<name>.py as a standalone module."""
+    spec = importlib.util.spec_from_file_location('cez_hdo_' + name, os.path.join(COMPONENT, name + '.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def sample_response():
+    """Return the raw bytes of the recorded sample response."""
+    with open(os.path.join(HERE, 'sample_response.json'), 'rb') as f:
+        return f.read()
@@ -0,0 +1,49 @@
+"""Import time of the integration modules, measured with python -X importtime.
+
+Every module is imported in a fresh interpreter. Modules of the package
+need Home Assistant installed and are skipped otherwise:
+
+    python benchmarks/bench_import.py [number of slowest modules to list]
+"""
+
+import os
+import subprocess
+import sys
+
+from _modules import HERE
+
+ROOT = os.path.abspath(os.path.join(HERE, '..'))
+MODULES = ('custom_components.cez_hdo', 'custom_components.cez_hdo.config_flow',
+           'custom_components.cez_hdo.coordinator', 'custom_components.cez_hdo.binary_sensor')
+
+
+def import_time(module):
+    """Return {imported module: (self us, cumulative us)} of importing the module."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode:
+        raise ImportError(result.stderr.strip().splitlines()[-1])
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+
+def main():
+    top = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for module in MODULES:
+        try:
+            times = import_time(module)
+        except ImportError as e:
+            print("%-42s skipped (%s)" % (module, e))
+            continue
+        print("%-42s %10.1f ms" % (module, times[module][1] / 1e3))
+        for name, (own, _cumulative) in sorted(times.items(), key=lambda t: -t[1][0])[:top]:
+            print("    %-38s %10.1f ms self" % (name, own / 1e3))
+
+
+if __name__ == '__main__':
+    main()
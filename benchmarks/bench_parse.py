@@ -0,0 +1,59 @@
+"""Benchmark of the response parsing against the former text based pipeline.
+
+Runs without Home Assistant on the recorded sample response:
+
+    python benchmarks/bench_parse.py
+"""
+
+import json
+import timeit
+
+from _modules import load, sample_response
+
+parser = load('parser')
+SAMPLE = sample_response()
+
+
+def legacy_parse_times(data):
+    r = []
+    for i in data['intervals']:
+        s = i.split(" - ")
+        if len(s) > 1:
+            r.append({'start': s[0], 'end': s[1]})
+    return {"id": data["day"], "platnost": data["day"], "casy": r}
+
+
+def legacy(raw):
+    """The pipeline before the parsing stage: decoded text, json and repeated indexing."""
+    text = raw.decode('UTF-8')
+    _data = json.loads(text)
+    _time_sets = []
+    for d in _data[0]['data']['hdoData']['resultPrint'][0]['rows']:
+        _time_sets.append(legacy_parse_times(d))
+    return {
+        "povel": _data[0]['data']['hdoData']['resultPrint'][0]['povel'],
+        "kod_povelu": _data[0]['data']['hdoData']['resultPrint'][0]['kod_povelu'],
+        "description": _data[0]['data']['hdoData']['resultPrint'][0]['description'],
+        "sazby": _time_sets
+    }
+
+
+def current(raw):
+    return parser.parse_result(parser.batch_results(raw, 1)[0])
+
+
+def _measure(stmt, number):
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    assert legacy(SAMPLE) == current(SAMPLE)
+    a = _measure(lambda: legacy(SAMPLE), 2000)
+    b = _measure(lambda: current(SAMPLE), 2000)
+    print("payload %d B, orjson %s" % (len(SAMPLE), "yes" if parser.orjson is not None else "no"))
+    print("%-10s %10.2f us" % ("legacy", a))
+    print("%-10s %10.2f us  (%.1fx)" % ("current", b, a / b))
+
+
+if __name__ == '__main__':
+    main()
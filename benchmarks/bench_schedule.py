@@ -0,0 +1,89 @@
+"""Benchmark of the schedule queries against the former linear scans.
+
+Runs without Home Assistant:
+
+    python benchmarks/bench_schedule.py
+"""
+
+import datetime
+import timeit
+
+from _modules import load
+
+schedule = load('schedule')
+
+DAY = [("0:00", "5:35"), ("6:30", "8:55"), ("9:55", "15:35"), ("16:35", "20:15"), ("21:15", "24:00")]
+
+
+def make_index():
+    """Build the weekly index of the sample day."""
+    day = [(schedule.parse_minutes(s), schedule.parse_minutes(e)) for s, e in DAY]
+    return schedule.ScheduleIndex(schedule.week_bounds([day] * schedule.DAYS_PER_WEEK))
+
+
+def make_times(weeks, start=datetime.date(2024, 1, 1)):
+    """Expand the sample day into (start, end) datetime tuples for the given number of weeks."""
+    times = []
+    for d in range(weeks * 7):
+        date = start + datetime.timedelta(days=d)
+        for s, e in DAY:
+            sh, sm = map(int, s.split(':'))
+            eh, em = map(int, e.split(':'))
+            begin = datetime.datetime.combine(date, datetime.time(sh, sm))
+            end = datetime.datetime.combine(date, datetime.time(0, 0)) + datetime.timedelta(hours=eh, minutes=em)
+            times.append((begin, end))
+    return times
+
+
+def linear_is_in_limit(times, time):
+    for t in times:
+        if t[0] < time < t[1]:
+            return True
+    return False
+
+
+def linear_find_next(times, time):
+    n = None
+    for t in times:
+        for i in [0, 1]:
+            if t[i] > time and (n is None or t[i] < n):
+                n = t[i]
+    return n
+
+
+def linear_following(times, time, max_count):
+    r = []
+    count = 0
+    for t in times:
+        if t[0] > time or t[1] > time:
+            r.append(t)
+            count += 1
+        if count >= max_count:
+            break
+    return r
+
+
+def _measure(stmt, number):
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    print("%-8s %-12s %12s %12s %8s" % ("weeks", "query", "linear [us]", "index [us]", "speedup"))
+    for weeks in (1, 4, 12, 52):
+        times = make_times(weeks)
+        # a query time in the middle of the horizon, right after a switch
+        now = times[len(times) // 2][1] + datetime.timedelta(seconds=1)
+        build = _measure(make_index, 20)
+        index = make_index()
+        for name, linear, indexed in (
+                ("is_on", lambda: linear_is_in_limit(times, now), lambda: index.is_on(now)),
+                ("find_next", lambda: linear_find_next(times, now), lambda: index.find_next(now)),
+                ("following", lambda: linear_following(times, now, 5), lambda: index.following(now, 5))):
+            a = _measure(linear, 200)
+            b = _measure(indexed, 200)
+            print("%-8d %-12s %12.2f %12.2f %7.1fx" % (weeks, name, a, b, a / b))
+        print("%-8d %-12s %12s %12.2f" % (weeks, "build", "-", build))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Local stand-in for https://www.cezdistribuce.cz/api/graphql.
+
+Answers batched hdoData queries with synthetic schedules, with configurable
+latency, error rate and payload size. Needs aiohttp only:
+
+    python benchmarks/fake_graphql.py --port 8765 --latency 0.2 --error-rate 0.1
+
+GET /stats returns the number of requests, operations and injected errors.
+"""
+
+import argparse
+import asyncio
+import random
+
+from aiohttp import web
+
+from suite import make_rows
+
+PATH = '/api/graphql'
+
+
+def make_result(code, rows):
+    """Return the hdoData operation result of the code."""
+    return {"data": {"hdoData": {
+        "resultPrint": [{"description": "Sazba D57d ", "kod": None, "kod_povelu": "405", "povel": code,
+                         "rows": rows, "__typename": "HdoResultPrint"}],
+        "queryDescription": "povel", "__typename": "HdoResponse"}}}
+
+
+def make_app(latency=0.0, jitter=0.0, error_rate=0.0, intervals=35, seed=None):
+    """Return the aiohttp application of the fake; its statistics are in app['stats']."""
+    stats = {"requests": 0, "operations": 0, "errors": 0}
+    rnd = random.Random(seed)
+    rows = make_rows(intervals)
+
+    async def graphql(request):
+        operations = await request.json()
+        stats["requests"] += 1
+        stats["operations"] += len(operations)
+        delay = latency + rnd.uniform(0, jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if rnd.random() < error_rate:
+            stats["errors"] += 1
+            return web.Response(status=503, text="injected error")
+        return web.json_response([make_result(op["variables"]["code"], rows) for op in operations])
+
+    async def get_stats(_request):
+        return web.json_response(stats)
+
+    app = web.Application()
+    app.router.add_post(PATH, graphql)
+    app.router.add_get('/stats', get_stats)
+    app['stats'] = stats
+    return app
+
+
+async def async_start(port=0, **kwargs):
+    """Start the fake on localhost and return (runner, url) of its endpoint."""
+    app = make_app(**kwargs)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, 'http://127.0.0.1:%d%s' % (port, PATH)
+
+
+def add_arguments(args):
+    args.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    args.add_argument('--jitter', type=float, default=0.0, help="random extra latency up to the seconds")
+    args.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered with 503")
+    args.add_argument('--intervals', type=int, default=35, help="low tariff intervals per week of every code")
+    args.add_argument('--seed', type=int, help="seed of the latency and error randomness")
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    args.add_argument('--port', type=int, default=8765)
+    add_arguments(args)
+    args = args.parse_args()
+    web.run_app(make_app(args.latency, args.jitter, args.error_rate, args.intervals, args.seed),
+                host='127.0.0.1', port=args.port)
+
+
+if __name__ == '__main__':
+    main()
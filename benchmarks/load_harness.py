@@ -0,0 +1,151 @@
+"""Load test of the integration with many config entries against the fake GraphQL server.
+
+Boots a throw-away Home Assistant instance (Home Assistant must be
+installed), sets up N config entries pointing at benchmarks/fake_graphql.py
+and measures setup time, refresh throughput, executor usage and event
+loop blocking:
+
+    python benchmarks/load_harness.py --entries 100 --rounds 5 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from types import MappingProxyType
+
+from homeassistant import bootstrap, config_entries, runner
+from homeassistant.const import CONF_CODE, CONF_RESOURCE
+
+import fake_graphql
+
+DOMAIN = 'cez_hdo'
+COMPONENT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'custom_components', DOMAIN)
+
+
+class LoopMonitor(object):
+    """Measures how late the event loop wakes up a periodically sleeping task."""
+
+    def __init__(self, interval=0.01):
+        self._interval = interval
+        self._task = None
+        self.lags = []
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self._interval)
+            self.lags.append(loop.time() - start - self._interval)
+
+    def stop(self):
+        self._task.cancel()
+
+    def summary(self):
+        lags = sorted(self.lags) or [0.0]
+        return {"max_ms": lags[-1] * 1e3, "p99_ms": lags[int(len(lags) * 0.99)] * 1e3,
+                "mean_ms": statistics.fmean(lags) * 1e3}
+
+
+class ExecutorCounter(object):
+    """Counts the jobs handed to the default executor of the loop."""
+
+    def __init__(self, loop):
+        self.jobs = 0
+        self._loop = loop
+        self._run_in_executor = loop.run_in_executor
+
+    def __enter__(self):
+        def run_in_executor(executor, func, *args):
+            self.jobs += 1
+            return self._run_in_executor(executor, func, *args)
+
+        self._loop.run_in_executor = run_in_executor
+        return self
+
+    def __exit__(self, *exc):
+        self._loop.run_in_executor = self._run_in_executor
+
+
+def prepare_config_dir(config_dir):
+    os.makedirs(os.path.join(config_dir, 'custom_components'))
+    os.symlink(os.path.abspath(COMPONENT), os.path.join(config_dir, 'custom_components', DOMAIN))
+    with open(os.path.join(config_dir, 'configuration.yaml'), 'w') as f:
+        f.write("homeassistant:\n  time_zone: Europe/Prague\n")
+
+
+def make_entry(i, url):
+    code = "LOAD%04d" % i
+    return config_entries.ConfigEntry(
+        version=1, minor_version=1, domain=DOMAIN, title=code, data={CONF_CODE: code, CONF_RESOURCE: url},
+        source=config_entries.SOURCE_USER, options={}, unique_id=code, discovery_keys=MappingProxyType({}))
+
+
+async def async_run(args):
+    fake, url = await fake_graphql.async_start(latency=args.latency, jitter=args.jitter,
+                                               error_rate=args.error_rate, intervals=args.intervals, seed=args.seed)
+    stats = fake.app['stats']
+    report = {"entries": args.entries}
+    with tempfile.TemporaryDirectory() as config_dir:
+        prepare_config_dir(config_dir)
+        hass = await bootstrap.async_setup_hass(runner.RuntimeConfig(config_dir=config_dir, skip_pip=True))
+        await hass.async_start()
+        monitor = LoopMonitor()
+        monitor.start()
+        try:
+            with ExecutorCounter(hass.loop) as executor:
+                entries = [make_entry(i, url) for i in range(args.entries)]
+                start = time.perf_counter()
+                await asyncio.gather(*(hass.config_entries.async_add(entry) for entry in entries))
+                await hass.async_block_till_done()
+                report["setup_s"] = time.perf_counter() - start
+                report["setup_requests"] = stats["requests"]
+                report["setup_executor_jobs"] = executor.jobs
+
+                # refresh every code as fast as possible, without the refetch throttle
+                sys.modules['custom_components.' + DOMAIN].MIN_REFETCH_INTERVAL = 0
+                coordinators = [hass.data[DOMAIN].entries[entry.entry_id] for entry in entries]
+                requests, jobs = stats["requests"], executor.jobs
+                durations = []
+                for _ in range(args.rounds):
+                    start = time.perf_counter()
+                    await asyncio.gather(*(coordinator.async_refresh() for coordinator in coordinators))
+                    durations.append(time.perf_counter() - start)
+                await hass.async_block_till_done()
+                report["refresh_round_s"] = statistics.fmean(durations) if durations else 0
+                report["refreshes_per_s"] = args.entries / report["refresh_round_s"] if durations else 0
+                report["refresh_requests"] = stats["requests"] - requests
+                report["refresh_executor_jobs"] = executor.jobs - jobs
+                report["failed_entries"] = sum(not coordinator.last_update_success for coordinator in coordinators)
+        finally:
+            monitor.stop()
+            report["loop_lag"] = monitor.summary()
+            report["fake"] = dict(stats)
+            await hass.async_stop()
+            await fake.cleanup()
+    return report
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    args.add_argument('--entries', type=int, default=50, help="number of config entries")
+    args.add_argument('--rounds', type=int, default=3, help="refresh rounds after the setup")
+    args.add_argument('--json', help="write the report to the file")
+    fake_graphql.add_arguments(args)
+    args = args.parse_args()
+    report = asyncio.run(async_run(args))
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
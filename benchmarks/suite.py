@@ -0,0 +1,148 @@
+"""Benchmark suite of the schedule hot paths.
+
+Runs without Home Assistant or network access on synthetic schedules
+scaling from 5 to thousands of intervals per week and batches from 1 to
+hundreds of codes:
+
+    python benchmarks/suite.py --json before.json
+    python benchmarks/suite.py --compare before.json
+
+Each case reports the best per-call time of several calibrated repeats in
+microseconds. With --compare the run fails if a case got slower than the
+threshold allows, so regressions in the update path show up across commits.
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import platform
+import sys
+import timeit
+
+from _modules import load
+
+parser = load('parser')
+schedule = load('schedule')
+
+INTERVALS = (5, 35, 350, 3500)
+CODES = (1, 10, 100, 500)
+NOW = datetime.datetime(2024, 1, 3, 12, 0, 30)
+MIDNIGHT = datetime.datetime(2024, 1, 4)
+DAY = datetime.timedelta(days=1)
+HOUR = datetime.timedelta(hours=1)
+
+
+def _fmt(minute):
+    return "%d:%02d" % divmod(minute, 60)
+
+
+def make_rows(intervals):
+    """Return seven resultPrint rows holding the given number of intervals per week in total."""
+    rows = []
+    for day in range(schedule.DAYS_PER_WEEK):
+        count = intervals // schedule.DAYS_PER_WEEK + (1 if day < intervals % schedule.DAYS_PER_WEEK else 0)
+        period = schedule.MINUTES_PER_DAY // max(count, 1)
+        rows.append({
+            "day": "day %d" % day,
+            "intervals": ["%s - %s" % (_fmt(i * period), _fmt(i * period + max(period // 2, 1)))
+                          for i in range(count)],
+            "__typename": "HdoRow",
+        })
+    return rows
+
+
+def make_response(codes, intervals=35):
+    """Return raw bytes of a batched response for the given number of codes."""
+    result = {"data": {"hdoData": {"resultPrint": [{
+        "description": "Sazba D57d ", "kod": None, "kod_povelu": "405", "povel": "A3B4DP1",
+        "rows": make_rows(intervals), "__typename": "HdoResultPrint"}]}}}
+    return json.dumps([result] * codes).encode('UTF-8')
+
+
+def make_index(intervals):
+    sazby = [parser.parse_times(row) for row in make_rows(intervals)]
+    days = [[(schedule.parse_minutes(t['start']), schedule.parse_minutes(t['end'])) for t in day['casy']]
+            for day in sazby]
+    return schedule.ScheduleIndex(schedule.week_bounds(days))
+
+
+def refresh(raw, codes):
+    """The update path of a batched refresh: split, parse and compile every code."""
+    for hdo_data in parser.batch_results(raw, codes):
+        data = parser.parse_result(hdo_data)
+        days = [[(schedule.parse_minutes(t['start']), schedule.parse_minutes(t['end'])) for t in day['casy']]
+                for day in data['sazby']]
+        schedule.ScheduleIndex(schedule.week_bounds(days))
+
+
+def cases():
+    """Yield (name, callable) of every benchmark case."""
+    yield "parse_minutes", lambda: schedule.parse_minutes("21:15")
+    yield "strfdelta", lambda: schedule.strfdelta(datetime.timedelta(hours=5, minutes=7), '{H}:{M:02}')
+    for n in INTERVALS:
+        row = make_rows(n * schedule.DAYS_PER_WEEK)[0]
+        yield "parse_times[%d/day]" % n, lambda row=row: parser.parse_times(row)
+    for n in INTERVALS:
+        index = make_index(n)
+        yield "build_index[%d]" % n, lambda n=n: make_index(n)
+        yield "intervals[%d]" % n, lambda index=index: index.intervals(NOW.date())
+        yield "is_on[%d]" % n, lambda index=index: index.is_on(NOW)
+        yield "find_next[%d]" % n, lambda index=index: index.find_next(NOW)
+        yield "following[%d]" % n, lambda index=index: index.following(NOW, 5)
+        yield "on_minutes[%d]" % n, lambda index=index: index.on_minutes(NOW, MIDNIGHT, NOW + DAY)
+        yield "best_windows[%d]" % n, lambda index=index: index.best_windows(NOW, NOW + 28 * DAY, 4 * HOUR, 3)
+    for n in CODES:
+        raw = make_response(n)
+        yield "refresh[%d codes]" % n, lambda raw=raw, n=n: refresh(raw, n)
+        yield "fingerprint[%d codes]" % n, lambda raw=raw: hashlib.blake2b(raw, digest_size=16).digest()
+
+
+def measure(stmt, repeat=5):
+    """Return the best per-call time in microseconds."""
+    timer = timeit.Timer(stmt)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def main(argv=None):
+    args = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    args.add_argument('--json', help="write the results to the file")
+    args.add_argument('--compare', help="compare against the results of a previous run")
+    args.add_argument('--threshold', type=float, default=1.25,
+                      help="slowdown ratio reported as a regression (default 1.25)")
+    args.add_argument('-k', dest='filter', help="only run cases containing the text")
+    args = args.parse_args(argv)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+
+    results = {}
+    regressions = []
+    for name, stmt in cases():
+        if args.filter and args.filter not in name:
+            continue
+        results[name] = measure(stmt)
+        line = "%-22s %12.2f us" % (name, results[name])
+        if name in baseline:
+            ratio = results[name] / baseline[name]
+            line += "  %5.2fx" % ratio
+            if ratio > args.threshold:
+                line += "  REGRESSION"
+                regressions.append(name)
+        print(line)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"python": platform.python_version(), "orjson": parser.orjson is not None,
+                       "results": results}, f, indent=2)
+    if regressions:
+        print("%d case(s) slower than %.2fx: %s" % (len(regressions), args.threshold, ", ".join(regressions)))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -10,47 +10,67 @@ import datetime
 import json
 
 from homeassistant.components.binary_sensor import PLATFORM_SCHEMA, BinarySensorDeviceClass, BinarySensorEntity
-from homeassistant.const import (CONF_NAME, CONF_VALUE_TEMPLATE, CONF_FORCE_UPDATE)
+from homeassistant.const import (CONF_CODE, CONF_NAME, CONF_VALUE_TEMPLATE, CONF_FORCE_UPDATE)
+from homeassistant.core import callback
+from homeassistant.exceptions import TemplateError
 from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.template import Template
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from . import DOMAIN, SERVICE, CONF_CODE, CONF_MAX_COUNT, CONF_REFRESH_RATE, TIMES, SCHEMA, _LOGGER, strfdelta, VERSION
+from . import SCHEMA, async_get_version, entry_config, unique_id
+from .const import DOMAIN, CONF_MAX_COUNT, LAST_UPDATE, _LOGGER
+from .schedule import strfdelta
 
 PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(SCHEMA)
 
 
-async def async_setup_entry(hass, config, async_add_entities):
+async def async_setup_entry(hass, entry, async_add_entities):
     """Set up ESPHome binary sensors based on a config entry."""
-    config = config.data
+    config = entry_config(entry)
     value_template = config.get(CONF_VALUE_TEMPLATE)
-    if value_template is not None:
-        value_template.hass = hass
-    sensor = HDORestSensor(hass, config.get(CONF_NAME), config.get(CONF_CODE), value_template,
-                           datetime.timedelta(seconds=config.get(CONF_REFRESH_RATE)), config.get(CONF_FORCE_UPDATE),
-                           config.get(CONF_MAX_COUNT))
-    async_add_entities([sensor], True)
-
-
-class HDORestSensor(BinarySensorEntity):
+    if value_template:
+        # compiled once per entry, rendered only when the state or the schedule changes
+        value_template = Template(value_template, hass)
+        try:
+            value_template.ensure_valid()
+        except TemplateError as e:
+            _LOGGER.error("Invalid value template of %s: %s", config.get(CONF_CODE), e)
+            value_template = None
+    else:
+        value_template = None
+    coordinator = hass.data[DOMAIN].entries[entry.entry_id]
+    sensor = HDORestSensor(hass, coordinator, config.get(CONF_NAME), config.get(CONF_CODE), value_template,
+                           config.get(CONF_FORCE_UPDATE), config.get(CONF_MAX_COUNT), await async_get_version(hass))
+    async_add_entities([sensor])
+
+
+class HDORestSensor(CoordinatorEntity, BinarySensorEntity):
     """Implementation of a REST sensor."""
 
-    def __init__(self, hass, name, code, value_template, refresh_rate, force_update, maxCount=10):
+    # The upcoming intervals are bulky and to_next only mirrors the clock, so neither is worth recording.
+    _unrecorded_attributes = frozenset({'following', 'to_next'})
+
+    def __init__(self, hass, coordinator, name, code, value_template, force_update, maxCount=10, version=None):
         """Initialize the REST sensor."""
+        super().__init__(coordinator)
         self._hass = hass
         self._attr_name = name
-        self._attr_unique_id = code
-        self._data = None
+        self._code = code
+        self._attr_unique_id = unique_id(code, coordinator.rest.area)
+        self._index = None
+        self._next_boundary = None
         self._value_template = value_template
         self._attr_force_update = force_update
         self._maxCount = maxCount
-        self._refresh_rate = refresh_rate
-        self._last_refresh = datetime.datetime.now() - 2 * self._refresh_rate
+        self._written = None
+        self._fetched = None
         self._attr_device_class = BinarySensorDeviceClass.POWER
         self._attr_extra_state_attributes = dict()
         self._attr_device_info = DeviceInfo(
             identifiers={(DOMAIN, self._attr_unique_id)},
             # If desired, the name for the device could be different to the entity
             name=self.name,
-            sw_version=VERSION,
+            sw_version=version,
             model="REST call",
             manufacturer="ČEZ distribuce",
         )
@@ -58,63 +78,85 @@ class HDORestSensor(BinarySensorEntity):
     @property
     def data(self):
         """Return the HDO data."""
-        return self._data
-
-    def update(self):
-        """Get the latest data from REST API and update the state."""
-        _LOGGER.info("Calling update %s", self._attr_unique_id)
-        if self._last_refresh + self._refresh_rate < datetime.datetime.now():
-            self._hass.services.call(DOMAIN, SERVICE, {CONF_CODE: self._attr_unique_id})
-            self._last_refresh = datetime.datetime.now()
-        if not self._hass.states.get(DOMAIN + '.' + self._attr_unique_id):
-            _LOGGER.warn('Unable to update data')
+        return self.coordinator.data
+
+    async def async_added_to_hass(self):
+        """Subscribe to schedule changes and tariff switches."""
+        await super().async_added_to_hass()
+        if self.coordinator.data is not None:
+            self._handle_coordinator_update()
+
+    @callback
+    def _handle_coordinator_update(self):
+        """Flip the state from the snapshot the coordinator takes at every tariff switch."""
+        self._index = self.coordinator.schedule
+        _LOGGER.debug('Updated sensor state: %s', self.data)
+        self._update_state()
+        self._async_write_changed_state()
+
+    @callback
+    def _async_write_changed_state(self):
+        """Write the state only if the tariff state, the upcoming schedule or the schedule itself changed.
+
+        With force_update the state is also written after every fetch of the
+        data, but not on the snapshot ticks of the coordinator.
+        """
+        written = (self._attr_is_on, self.available, self.extra_state_attributes.get('next'),
+                   tuple((f['start'], f['end']) for f in self.extra_state_attributes.get('following', ())),
+                   # a new schedule re-renders the template, which sees all of it, even if it differs only later on
+                   self.coordinator.schedule_version)
+        fetched = self.data.get(LAST_UPDATE) if self.data else None
+        refreshed, self._fetched = fetched != self._fetched, fetched
+        if written != self._written:
+            self._written = written
+            self._render_value()
+        elif not (self._attr_force_update and refreshed):
+            return
+        self.async_write_ha_state()
+
+    def _render_value(self):
+        """Render the value template into the value attribute."""
+        if self._value_template is None:
+            return
+        try:
+            self.extra_state_attributes['value'] = self._value_template.async_render({
+                'is_on': self._attr_is_on, 'next': self._next_boundary,
+                'following': self.extra_state_attributes.get('following', []),
+                CONF_CODE: self._code, 'data': self.data})
+        except TemplateError as e:
+            _LOGGER.error("Error rendering value template of %s: %s", self._code, e)
+            self.extra_state_attributes['value'] = None
+
+    def _update_state(self):
+        """Update the state from the current HDO data."""
+        if not self._index:
             return
-        else:
-            self._data = self._hass.states.get(DOMAIN + '.' + self._attr_unique_id).attributes
-            _LOGGER.debug('Updated sensor state: %s', self._data)
 
         """Parse the return text as JSON and save the json as an attribute."""
         try:
             _LOGGER.debug("Parsing attributes...")
 
             now = datetime.datetime.now()
-            self._attr_is_on = self.is_in_limit(now)
-            self.extra_state_attributes['next'] = self.find_next(
-                now).strftime('%H:%M')
+            next_boundary = self.coordinator.next_switch
+            self._next_boundary = next_boundary
+            self._attr_is_on = self.coordinator.is_on
+            self.extra_state_attributes['next'] = next_boundary.strftime('%H:%M') if next_boundary else None
             self.extra_state_attributes['to_next'] = strfdelta(
-                self.find_next(now) - now, '{H}:{M:02}')
+                next_boundary - now.astimezone(), '{H}:{M:02}') if next_boundary else None
             self.extra_state_attributes['following'] = self.following(
                 now, self._maxCount)
-            self.extra_state_attributes[CONF_CODE] = self._attr_unique_id
+            self.extra_state_attributes[CONF_CODE] = self._code
 
         except json.JSONDecodeError:
             _LOGGER.debug("Error decoding JSON. Resetting attributes")
             self._attr_extra_state_attributes = {}
 
     def is_in_limit(self, time):
-        for t in self.data[TIMES]:
-            if t[0] < time < t[1]:
-                return True
-        return False
+        return self._index.is_on(time)
 
     def find_next(self, time):
-        n = None
-        for t in self.data[TIMES]:
-            for i in [0, 1]:
-                if t[i] > time and (n is None or t[i] < n):
-                    n = t[i]
-        return n
+        return self._index.find_next(time) if self._index else None
 
     def following(self, time, maxCount):
-        r = []
-        count = 0
-        for t in self.data[TIMES]:
-            if t[0] > time or t[1] > time:
-                r.append(dict(start=t[0], end=t[1], duration=':'.join(
-                    str(t[1] - t[0])
-                    .split(':')[:2])))
-                count += 1
-            if count >= maxCount:
-                break
-
-        return r
+        return [dict(start=start, end=end, duration=':'.join(str(end - start).split(':')[:2]))
+                for start, end in self._index.following(time, maxCount)]
@@ -4,10 +4,12 @@ from collections import OrderedDict
 
 import voluptuous as vol
 from homeassistant import config_entries
-from homeassistant.const import CONF_CODE, CONF_NAME, CONF_VALUE_TEMPLATE, CONF_FORCE_UPDATE
+from homeassistant.const import CONF_CODE, CONF_NAME, CONF_VALUE_TEMPLATE, CONF_FORCE_UPDATE, CONF_TIMEOUT
 from homeassistant.core import callback
 
-from . import DOMAIN, DEFAULT_NAME, CONF_REFRESH_RATE, CONF_MAX_COUNT
+from . import entry_config, unique_id
+from .const import (DOMAIN, DEFAULT_NAME, DEFAULT_AREA, DEFAULT_TIMEOUT, AREAS, CONF_AREA, CONF_REFRESH_RATE,
+                    CONF_MAX_COUNT)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -30,7 +32,8 @@ class HDOFlowHandler(config_entries.ConfigFlow):
         if user_input is not None:
             if user_input[CONF_CODE] != "":
                 # Remember Frequency
-                await self.async_set_unique_id(user_input[CONF_CODE])
+                await self.async_set_unique_id(unique_id(user_input[CONF_CODE], user_input.get(CONF_AREA)))
+                self._abort_if_unique_id_configured()
                 self._data.update(user_input)
                 if CONF_REFRESH_RATE in user_input:
                     self._data[CONF_REFRESH_RATE] = user_input[CONF_REFRESH_RATE]
@@ -49,12 +52,14 @@ class HDOFlowHandler(config_entries.ConfigFlow):
                 code = user_input[CONF_CODE]
         data_schema = OrderedDict()
         data_schema[vol.Required(CONF_CODE, default=code)] = str
+        data_schema[vol.Optional(CONF_AREA, default=DEFAULT_AREA)] = vol.In(AREAS)
         data_schema[vol.Optional(CONF_NAME, default=DEFAULT_NAME)] = str
         data_schema[vol.Optional(CONF_VALUE_TEMPLATE)] = str
-        data_schema[vol.Optional(CONF_FORCE_UPDATE, default=True)] = bool
+        data_schema[vol.Optional(CONF_FORCE_UPDATE, default=False)] = bool
         data_schema[
             vol.Optional(CONF_REFRESH_RATE, default=86400)] = int
         data_schema[vol.Optional(CONF_MAX_COUNT, default=5)] = int
+        data_schema[vol.Optional(CONF_TIMEOUT, default=DEFAULT_TIMEOUT)] = int
         form = self.async_show_form(step_id="user", data_schema=vol.Schema(data_schema), errors=self._errors)
         return form
 
@@ -85,7 +90,8 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
     def __init__(self, config_entry):
         """Read the configuration and initialize data."""
         self.config_entry = config_entry
-        self._data = dict(config_entry.options)
+        # the options replace the whole configuration, so start from all of it
+        self._data = entry_config(config_entry)
         self._errors = {}
 
     async def async_step_init(self, user_input=None):
@@ -93,8 +99,8 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
 
         if user_input is not None:
             # Update entry
+            # the code and the area identify the entry, they are kept as created
             self._data.update(user_input)
-            self._data[CONF_CODE] = self.config_entry.unique_id
             if CONF_REFRESH_RATE in user_input:
                 self._data[CONF_REFRESH_RATE] = user_input[CONF_REFRESH_RATE]
             return self.async_create_entry(title=self._data[CONF_CODE], data=self._data)
@@ -104,18 +110,20 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
     async def _show_init_form(self, user_input):
         """Configure the form."""
         if user_input is None:
-            user_input = self.config_entry.data
+            user_input = entry_config(self.config_entry)
         data_schema = OrderedDict()
         data_schema[
             vol.Optional(CONF_NAME, default=user_input[CONF_NAME] if CONF_NAME in user_input else DEFAULT_NAME)] = str
         data_schema[vol.Optional(CONF_VALUE_TEMPLATE, default=user_input[
             CONF_VALUE_TEMPLATE] if CONF_VALUE_TEMPLATE in user_input else "")] = str
         data_schema[vol.Optional(CONF_FORCE_UPDATE, default=user_input[
-            CONF_FORCE_UPDATE] if CONF_FORCE_UPDATE in user_input else True)] = bool
+            CONF_FORCE_UPDATE] if CONF_FORCE_UPDATE in user_input else False)] = bool
         data_schema[vol.Optional(CONF_REFRESH_RATE, default=user_input[
             CONF_REFRESH_RATE] if CONF_REFRESH_RATE in user_input else 86400)] = int
         data_schema[vol.Optional(CONF_MAX_COUNT,
                                  default=user_input[CONF_MAX_COUNT] if CONF_MAX_COUNT in user_input else 5)] = int
+        data_schema[vol.Optional(CONF_TIMEOUT, default=user_input[
+            CONF_TIMEOUT] if CONF_TIMEOUT in user_input else DEFAULT_TIMEOUT)] = int
         return self.async_show_form(step_id="init", data_schema=vol.Schema(data_schema), errors=self._errors)
 
 
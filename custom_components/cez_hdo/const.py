@@ -0,0 +1,56 @@
+"""Constants of the ČEZ HDO integration."""
+
+import datetime
+import logging
+
+_LOGGER = logging.getLogger(__package__)
+
+CONF_MAX_COUNT = 'maxCount'
+CONF_REFRESH_RATE = 'refreshRate'
+CONF_AREA = 'area'
+CONF_CYCLES = 'cycles'
+CONF_DURATION = 'duration'
+CONF_TOP = 'top'
+CONF_HORIZON = 'horizon'
+CONF_COUNT = 'count'
+CONF_AFTER = 'after'
+CONF_BEFORE = 'before'
+CONF_MIN_SHARE = 'min_share'
+
+DEFAULT_METHOD = 'GET'
+DEFAULT_VERIFY_SSL = True
+DEFAULT_TIMEOUT = 10
+DEFAULT_AREA = 'stred'
+AREAS = ('stred', 'zapad', 'sever', 'vychod', 'morava')
+# Keep in sync with manifest.json, which is not read at import time to keep the import free of blocking I/O.
+DOMAIN = "cez_hdo"
+DEFAULT_NAME = "ČEZ HDO"
+PLATFORMS = ["binary_sensor", "sensor"]
+ISSUE_URL = "https://github.com/konikvranik/hacs_cez/issues"
+SERVICE = 'refresh'
+SERVICE_PROFILE = 'profile'
+SERVICE_FIND_WINDOW = 'find_window'
+TIMES = 'times'
+LAST_UPDATE = 'last_update'
+NEXT_DUE = 'next_due'
+STORAGE_VERSION = 1
+STORAGE_KEY = DOMAIN
+VIEW_KEY = DOMAIN + '_view'
+CACHE_KEY = DOMAIN + '_cache'
+STORAGE_SAVE_DELAY = 10
+API_URL = 'https://www.cezdistribuce.cz/api/graphql'
+HDO_QUERY = ('query hdoData($code: String, $area: String) { hdoData(code: $code, area: $area) {'
+             ' resultPrint { description kod kod_povelu povel rows { day intervals __typename } __typename }'
+             ' queryDescription __typename } } ')
+BATCH_DELAY = 1
+MIN_REFETCH_INTERVAL = 60
+RETRY_BACKOFF_BASE = 60
+RETRY_BACKOFF_MAX = 3600
+CIRCUIT_THRESHOLD = 5
+CIRCUIT_COOLDOWN = 1800
+SNAPSHOT_INTERVAL = 300
+SEASONAL_REFRESH_RATE = datetime.timedelta(hours=6)
+REFRESH_JITTER = 0.1
+STARTUP_SPREAD = 300
+# seconds the live updates may be profiled for, the profiler slows the whole event loop down
+MAX_PROFILE_DURATION = 300
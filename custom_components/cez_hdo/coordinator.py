@@ -0,0 +1,750 @@
+"""Registry, coordinators and batched fetching of the HDO schedules.
+
+Imported when the first entry is set up, the update coordinator helper loads
+aiohttp and the rest of the HTTP stack.
+"""
+
+import asyncio
+import datetime
+import hashlib
+import json
+import logging
+import random
+import time
+
+import aiohttp
+from homeassistant import config_entries
+from homeassistant.const import CONF_CODE, CONF_RESOURCE, CONF_TIMEOUT
+from homeassistant.core import callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import async_call_later, async_track_point_in_time
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+
+from .const import (_LOGGER, BATCH_DELAY, CACHE_KEY, CIRCUIT_COOLDOWN, CIRCUIT_THRESHOLD, CONF_AREA, CONF_REFRESH_RATE,
+                    DEFAULT_AREA, DEFAULT_TIMEOUT, DEFAULT_VERIFY_SSL, DOMAIN, HDO_QUERY, LAST_UPDATE,
+                    MIN_REFETCH_INTERVAL, NEXT_DUE, REFRESH_JITTER, RETRY_BACKOFF_BASE, RETRY_BACKOFF_MAX,
+                    SEASONAL_REFRESH_RATE, SNAPSHOT_INTERVAL, STARTUP_SPREAD, STORAGE_KEY, STORAGE_SAVE_DELAY,
+                    STORAGE_VERSION, TIMES)
+from .parser import batch_results, parse_result
+from .schedule import (DAYS_PER_WEEK, MINUTES_PER_DAY, ScheduleIndex, near_seasonal_change, next_seasonal_window,
+                       parse_minutes, week_bounds)
+from .stats import HDOStats
+
+
+class HDORegistry(object):
+    """Class owning the fetchers and schedules shared by the entries, reference counted per (code, area)."""
+
+    def __init__(self, hass):
+        """Initialize the registry."""
+        self._hass = hass
+        # the cache outlives the registry, so removed entries can still be dropped from it
+        if CACHE_KEY not in hass.data:
+            hass.data[CACHE_KEY] = HDOScheduleCache(hass)
+        self.cache = hass.data[CACHE_KEY]
+        self.fetchers = dict()
+        self.coordinators = dict()
+        self.entries = dict()
+        self.profiling = False
+        self._users = dict()
+
+    @callback
+    def async_acquire(self, entry_id, config):
+        """Return the coordinator of the code and area of the entry, creating it for its first user."""
+        key = (config[CONF_CODE], config[CONF_AREA])
+        if key not in self.coordinators:
+            _LOGGER.debug("Registering %s", key)
+            resource = config[CONF_RESOURCE]
+            if resource not in self.fetchers:
+                self.fetchers[resource] = HDOBatchFetcher(self._hass, 'POST', resource, DEFAULT_VERIFY_SSL)
+            rest = HDORestData(self.fetchers[resource], key[0], key[1], config[CONF_TIMEOUT])
+            # the coordinator outlives the entry creating it, so it must not be bound to that entry
+            token = config_entries.current_entry.set(None)
+            try:
+                self.coordinators[key] = HDOCoordinator(self._hass, rest, self.cache,
+                                                        datetime.timedelta(seconds=config[CONF_REFRESH_RATE]))
+            finally:
+                config_entries.current_entry.reset(token)
+        self._users[key] = self._users.get(key, 0) + 1
+        self.entries[entry_id] = self.coordinators[key]
+        return self.coordinators[key]
+
+    async def async_release(self, entry_id):
+        """Drop the reference of the entry and shut the coordinator down when it was the last user."""
+        coordinator = self.entries.pop(entry_id, None)
+        if coordinator is None:
+            return
+        key = (coordinator.rest.code, coordinator.rest.area)
+        self._users[key] -= 1
+        if self._users[key]:
+            return
+        _LOGGER.debug("Unregistering %s", key)
+        del self._users[key]
+        del self.coordinators[key]
+        await coordinator.async_shutdown()
+        fetcher = coordinator.rest.fetcher
+        if not any(c.rest.fetcher is fetcher for c in self.coordinators.values()):
+            self.fetchers.pop(fetcher.resource, None)
+
+    def find(self, code=None, area=None):
+        """Return the coordinators of the code and area, all of them if not given."""
+        return [c for (c_code, c_area), c in self.coordinators.items()
+                if code in (None, c_code) and area in (None, c_area)]
+
+
+class HDOCoordinator(DataUpdateCoordinator):
+    """Class holding the parsed schedule of one code in memory and notifying its entities."""
+
+    def __init__(self, hass, rest, cache, refresh_rate):
+        """Initialize the coordinator."""
+        # the data of an unchanged schedule stays the same object, so the entities are not even notified;
+        # refreshes are planned by the coordinator itself, see _next_due
+        super().__init__(hass, _LOGGER, name="%s %s" % (DOMAIN, rest.code), update_interval=None,
+                         always_update=False)
+        self.rest = rest
+        self.refresh_rate = refresh_rate
+        self.next_due = None
+        self._cache = cache
+        self._unsub_retry = None
+        self._unsub_due = None
+        self._unsub_tick = None
+        self.is_on = None
+        self.next_switch = None
+        self.low_minutes_today = None
+        self.low_share_24h = None
+
+    @property
+    def schedule(self):
+        """Return the schedule index of the code."""
+        return self.rest.schedule
+
+    @property
+    def schedule_version(self):
+        """Return the number of schedules of the code compiled so far."""
+        return self.rest.version
+
+    @callback
+    def async_restore(self):
+        """Serve the schedule persisted by a previous run, if any."""
+        cached = self._cache.get(self.rest.code, self.rest.area)
+        if not cached:
+            return False
+        _LOGGER.debug("Restoring cached schedule of %s", self.rest.code)
+        self.rest.restore(cached)
+        self.async_set_updated_data(self.rest.data)
+        due = self.data[LAST_UPDATE] + self.refresh_rate
+        cached_due = self._cache.due(self.rest.code, self.rest.area)
+        if cached_due:
+            # a refresh rate lowered in the options meanwhile must not wait for the old due time
+            due = min(cached_due, due)
+        now = datetime.datetime.now()
+        if due <= now:
+            # spread the overdue codes instead of refreshing all of them at startup
+            due = now + datetime.timedelta(seconds=random.uniform(0, STARTUP_SPREAD))
+        self._async_schedule_due(due)
+        return True
+
+    async def _async_update_data(self):
+        await self.rest.async_update()
+        if self.rest.failures:
+            self._async_schedule_retry()
+            if self.rest.data is None:
+                raise UpdateFailed("No HDO data for %s" % self.rest.code)
+            _LOGGER.debug("Serving the last good HDO data of %s", self.rest.code)
+        else:
+            self._async_schedule_due(self._next_due(datetime.datetime.now()))
+            self._cache.async_save(self.rest.code, self.rest.area, self.rest.data, self.next_due)
+        return self.rest.data
+
+    def _next_due(self, now):
+        """Return when to refresh the code next.
+
+        Around the seasonal schedule changes the code is refreshed every
+        SEASONAL_REFRESH_RATE, otherwise after the refresh rate. The interval is
+        shortened by a random jitter, so the codes drift apart instead of
+        refreshing in the same instant.
+        """
+        interval = self.refresh_rate
+        if near_seasonal_change(now.date()):
+            interval = min(interval, SEASONAL_REFRESH_RATE)
+        due = now + interval * random.uniform(1 - REFRESH_JITTER, 1)
+        window = datetime.datetime.combine(next_seasonal_window(now.date()), datetime.time())
+        if due > window:
+            # do not sleep over the next seasonal change
+            due = window + SEASONAL_REFRESH_RATE * random.uniform(0, 1)
+        return due
+
+    @callback
+    def _async_schedule_due(self, due):
+        if self._unsub_due is not None:
+            self._unsub_due()
+        self.next_due = due
+        delay = max(0.0, (due - datetime.datetime.now()).total_seconds())
+        _LOGGER.debug("Refreshing HDO data of %s at %s", self.rest.code, due)
+        self._unsub_due = async_call_later(self.hass, delay, self._async_due)
+
+    async def _async_due(self, _now):
+        self._unsub_due = None
+        await self.async_refresh()
+
+    @callback
+    def _async_schedule_retry(self):
+        """Retry the failed fetch in the background with exponential backoff and jitter."""
+        if self._unsub_retry is not None:
+            return
+        delay = min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** (self.rest.failures - 1))
+        delay *= random.uniform(0.5, 1)
+        _LOGGER.debug("Retrying HDO data of %s in %.0f s", self.rest.code, delay)
+        self._unsub_retry = async_call_later(self.hass, delay, self._async_retry)
+
+    @callback
+    def async_update_listeners(self):
+        """Take a snapshot of the schedule and notify the entities, which all read the same snapshot."""
+        self._async_snapshot()
+        super().async_update_listeners()
+
+    @callback
+    def _async_snapshot(self):
+        """Evaluate the schedule now and plan the next snapshot.
+
+        The next snapshot is taken at the next tariff switch, at midnight or after
+        SNAPSHOT_INTERVAL at the latest, so the running totals do not go stale.
+        """
+        if self._unsub_tick is not None:
+            self._unsub_tick()
+            self._unsub_tick = None
+        index = self.schedule
+        if not index:
+            return
+        now = datetime.datetime.now()
+        next_switch = index.find_next(now)
+        midnight = datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time())
+        today, day = index.on_minutes(now, midnight, now + datetime.timedelta(days=1))
+        self.is_on = index.is_on(now)
+        self.next_switch = next_switch.astimezone() if next_switch else None
+        self.low_minutes_today = round(today)
+        self.low_share_24h = round(day / MINUTES_PER_DAY * 100, 1)
+        tick = min(t for t in (next_switch, midnight, now + datetime.timedelta(seconds=SNAPSHOT_INTERVAL)) if t)
+        self._unsub_tick = async_track_point_in_time(self.hass, self._async_tick, tick.astimezone())
+
+    @callback
+    def _async_tick(self, _now):
+        self._unsub_tick = None
+        self.async_update_listeners()
+
+    async def async_update_cycle(self):
+        """Fetch, parse and compile the schedule and update the entities, bypassing the refetch throttle.
+
+        The unchanged payload and schedule short-circuits are bypassed too, so every cycle does the full work.
+        """
+        await self.rest.async_update(force=True)
+        if self.rest.data is not None:
+            self.async_set_updated_data(self.rest.data)
+
+    async def _async_retry(self, _now):
+        self._unsub_retry = None
+        await self.async_refresh()
+
+    async def async_shutdown(self):
+        """Cancel a pending retry, refresh and the next snapshot."""
+        if self._unsub_retry is not None:
+            self._unsub_retry()
+            self._unsub_retry = None
+        if self._unsub_due is not None:
+            self._unsub_due()
+            self._unsub_due = None
+        if self._unsub_tick is not None:
+            self._unsub_tick()
+            self._unsub_tick = None
+        await super().async_shutdown()
+
+
+class HDOScheduleCache(object):
+    """Class for persisting the last parsed schedule of every code and area."""
+
+    def __init__(self, hass):
+        """Initialize the cache."""
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._data = None
+
+    async def async_load(self):
+        """Load the persisted schedules once."""
+        if self._data is None:
+            data = await self._store.async_load()
+            # entries set up concurrently may have stored schedules meanwhile
+            if self._data is None:
+                self._data = data or {}
+        return self._data
+
+    @staticmethod
+    def _key(code, area):
+        return "%s|%s" % (code, area)
+
+    def get(self, code, area):
+        """Return the persisted schedule of the code and area."""
+        return self._data.get(self._key(code, area)) if self._data else None
+
+    def due(self, code, area):
+        """Return the persisted time of the next refresh of the code and area."""
+        cached = self.get(code, area)
+        return datetime.datetime.fromisoformat(cached[NEXT_DUE]) if cached and cached.get(NEXT_DUE) else None
+
+    @callback
+    def async_save(self, code, area, data, next_due=None):
+        """Persist the schedule of the code, without the expanded times, and the time of its next refresh."""
+        cached = {k: v for k, v in data.items() if k != TIMES}
+        cached[LAST_UPDATE] = data[LAST_UPDATE].isoformat()
+        cached[NEXT_DUE] = next_due.isoformat() if next_due else None
+        self._data[self._key(code, area)] = cached
+        self._store.async_delay_save(lambda: self._data, STORAGE_SAVE_DELAY)
+
+    @callback
+    def async_remove(self, code, area):
+        """Forget the persisted schedule of the code and area."""
+        if self._data and self._data.pop(self._key(code, area), None) is not None:
+            self._store.async_delay_save(lambda: self._data, STORAGE_SAVE_DELAY)
+
+
+class HDOFetchError(Exception):
+    """Error raised when the HDO data could not be fetched."""
+
+
+class CircuitOpenError(HDOFetchError):
+    """Error raised instead of calling an endpoint that keeps failing."""
+
+
+class HDOBatchFetcher(object):
+    """Class for sending HDO queries of all codes due for refresh in one GraphQL request."""
+
+    def __init__(self, hass, method, resource, verify_ssl, delay=BATCH_DELAY):
+        """Initialize the fetcher."""
+        self._hass = hass
+        self._method = method
+        self.resource = resource
+        self._verify_ssl = verify_ssl
+        self._delay = delay
+        self._headers = {"content-type": "application/json", "accept": "application/json", "x-locale": "cs"}
+        self._pending = {}
+        self._timeout = 0
+        self._unsub = None
+        self._failures = 0
+        self._open_until = 0
+        self._last_batch = None
+        self._force = False
+
+    async def async_fetch(self, code, area, timeout=DEFAULT_TIMEOUT, force=False):
+        """Queue the code for the next batch.
+
+        Returns its hdoData result with the latency in ms and the size of the batched response carrying it.
+        A forced batch is decoded even if the payload is the same as last time.
+        """
+        if self._failures >= CIRCUIT_THRESHOLD and time.monotonic() < self._open_until:
+            raise CircuitOpenError("%s failed %d times in a row" % (self.resource, self._failures))
+        key = (code, area)
+        if key not in self._pending:
+            self._pending[key] = self._hass.loop.create_future()
+        self._timeout = max(self._timeout, timeout)
+        self._force = self._force or force
+        if self._unsub is None:
+            self._unsub = async_call_later(self._hass, self._delay, self._flush)
+        return await asyncio.shield(self._pending[key])
+
+    def as_dict(self):
+        """Return the state of the fetcher as a JSON serializable dict."""
+        return {"resource": self.resource, "queued": len(self._pending), "consecutive_failures": self._failures,
+                "circuit_open": self._failures >= CIRCUIT_THRESHOLD and time.monotonic() < self._open_until}
+
+    @callback
+    def _flush(self, _now):
+        self._unsub = None
+        pending, self._pending = self._pending, {}
+        timeout, self._timeout = self._timeout, 0
+        force, self._force = self._force, False
+        self._hass.async_create_task(self._async_send(pending, timeout, force))
+
+    async def _async_send(self, pending, timeout, force=False):
+        body = json.dumps([{"operationName": "hdoData", "variables": {"code": code, "area": area}, "query": HDO_QUERY}
+                           for code, area in pending])
+        _LOGGER.debug("Fetching HDO data for %s", list(pending))
+        start = time.perf_counter()
+        try:
+            session = async_get_clientsession(self._hass, self._verify_ssl)
+            async with session.request(self._method, self.resource, headers=self._headers, data=body,
+                                       timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                response.raise_for_status()
+                raw = await response.read()
+            latency = (time.perf_counter() - start) * 1000
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug(raw.decode('UTF-8', 'replace'))
+            digest = hashlib.blake2b(raw, digest_size=16).digest()
+            keys = tuple(pending)
+            if not force and self._last_batch is not None and self._last_batch[:2] == (keys, digest):
+                # the same payload as last time, the results are handed out again without decoding it
+                results = self._last_batch[2]
+            else:
+                results = batch_results(raw, len(pending))
+                self._last_batch = (keys, digest, results)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            error = HDOFetchError("%s: %s" % (type(e).__name__, e))
+            self._failures += 1
+            if self._failures >= CIRCUIT_THRESHOLD:
+                _LOGGER.warning("%s failed %d times in a row, pausing requests for %d s",
+                                self.resource, self._failures, CIRCUIT_COOLDOWN)
+                self._open_until = time.monotonic() + CIRCUIT_COOLDOWN
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        self._failures = 0
+        for future, result in zip(pending.values(), results):
+            if not future.done():
+                future.set_result((result, latency, len(raw)))
+
+
+class HDORestData(object):
+    """Class for handling the data retrieval."""
+
+    def __init__(self, fetcher, code, area=DEFAULT_AREA, timeout=DEFAULT_TIMEOUT):
+        """Initialize the data object.
+         {
+            "validFrom": "1. 4. 2019",
+            "validTo": "1. 1. 2099",
+            "dumpId": "34",
+            "povel": "A3B4DP1",
+            "kodPovelu": "405",
+            "sazba": "D57d",
+            "info": "sazba",
+            "doba": "20",
+            "date": "2019-03-22 07:21:11.245",
+            "description": "2019_jaro_stred",
+            "sazby" : [
+                {
+                    "id": "7780",
+                    "platnost": "Po - Pá",
+                    "casy" : [
+                        {"start": "00:00", "stop": "05:35"},
+                        {"start": "06:30", "stop": "08:55"},
+                        {"start": "09:55", "stop": "14:15"},
+                        {"start": "15:10", "stop": "20:15"},
+                        {"start": "21:15", "stop": "23:59"},
+                    ]
+                },
+                {
+                    "id": "7781",
+                    "platnost": "So - Ne",
+                    "casy" : [
+                        {"start": "00:00", "stop": "06:15"},
+                        {"start": "07:15", "stop": "08:55"},
+                        {"start": "09:55", "stop": "12:55"},
+                        {"start": "13:55", "stop": "18:55"},
+                        {"start": "19:55", "stop": "23:59"},
+                    ]
+                }
+            ]
+        }
+
+
+
+        [
+    {
+        "data": {
+            "hdoData": {
+                "result": [
+                    {
+                        "description": "Sazba D57d ",
+                        "kod": null,
+                        "kod_povelu": "405",
+                        "povel": "A3B4DP1",
+                        "timelines": [
+                            {
+                                "description": "Pondělí - Pátek (20 hodin denně)",
+                                "intervals": [
+                                    {
+                                        "left": 0,
+                                        "width": 23.2128,
+                                        "text": "0:00 - 5:35",
+                                        "__typename": "HdoInterval"
+                                    },
+                                    {
+                                        "left": 27.04,
+                                        "width": 10.0672,
+                                        "text": "6:30 - 8:55",
+                                        "__typename": "HdoInterval"
+                                    },
+                                    {
+                                        "left": 41.2672,
+                                        "width": 23.545599999999993,
+                                        "text": "9:55 - 15:35",
+                                        "__typename": "HdoInterval"
+                                    },
+                                    {
+                                        "left": 68.97279999999999,
+                                        "width": 15.267200000000017,
+                                        "text": "16:35 - 20:15",
+                                        "__typename": "HdoInterval"
+                                    },
+                                    {
+                                        "left": 88.4,
+                                        "width": 11.439999999999998,
+                                        "text": "21:15 - 24:00",
+                                        "__typename": "HdoInterval"
+                                    }
+                                ],
+                                "__typename": "HdoTimeline"
+                            },
+                            {
+                                "description": "Sobota - Neděle (20 hodin denně)",
+                                "intervals": [
+                                    {
+                                        "left": 0,
+                                        "width": 38.1472,
+                                        "text": "0:00 - 9:10",
+                                        "__typename": "HdoInterval"
+                                    },
+                                    {
+                                        "left": 42.3072,
+                                        "width": 9.692799999999998,
+                                        "text": "10:10 - 12:30",
+                                        "__typename": "HdoInterval"
+                                    },
+                                    {
+                                        "left": 56.160000000000004,
+                                        "width": 22.54720000000001,
+                                        "text": "13:30 - 18:55",
+                                        "__typename": "HdoInterval"
+                                    },
+                                    {
+                                        "left": 82.86720000000001,
+                                        "width": 8.319999999999993,
+                                        "text": "19:55 - 21:55",
+                                        "__typename": "HdoInterval"
+                                    },
+                                    {
+                                        "left": 95.34720000000002,
+                                        "width": 4.492799999999988,
+                                        "text": "22:55 - 24:00",
+                                        "__typename": "HdoInterval"
+                                    }
+                                ],
+                                "__typename": "HdoTimeline"
+                            }
+                        ],
+                        "__typename": "HdoResult"
+                    }
+                ],
+                "resultPrint": [
+                    {
+                        "description": "Sazba D57d ",
+                        "kod": null,
+                        "kod_povelu": "405",
+                        "povel": "A3B4DP1",
+                        "rows": [
+                            {
+                                "day": "Pondělí",
+                                "intervals": [
+                                    "0:00 - 5:35",
+                                    "6:30 - 8:55",
+                                    "9:55 - 15:35",
+                                    "16:35 - 20:15",
+                                    "21:15 - 24:00"
+                                ],
+                                "__typename": "HdoRow"
+                            },
+                            {
+                                "day": "Úterý",
+                                "intervals": [
+                                    "0:00 - 5:35",
+                                    "6:30 - 8:55",
+                                    "9:55 - 15:35",
+                                    "16:35 - 20:15",
+                                    "21:15 - 24:00"
+                                ],
+                                "__typename": "HdoRow"
+                            },
+                            {
+                                "day": "Středa",
+                                "intervals": [
+                                    "0:00 - 5:35",
+                                    "6:30 - 8:55",
+                                    "9:55 - 15:35",
+                                    "16:35 - 20:15",
+                                    "21:15 - 24:00"
+                                ],
+                                "__typename": "HdoRow"
+                            },
+                            {
+                                "day": "Čtvrtek",
+                                "intervals": [
+                                    "0:00 - 5:35",
+                                    "6:30 - 8:55",
+                                    "9:55 - 15:35",
+                                    "16:35 - 20:15",
+                                    "21:15 - 24:00"
+                                ],
+                                "__typename": "HdoRow"
+                            },
+                            {
+                                "day": "Pátek",
+                                "intervals": [
+                                    "0:00 - 5:35",
+                                    "6:30 - 8:55",
+                                    "9:55 - 15:35",
+                                    "16:35 - 20:15",
+                                    "21:15 - 24:00"
+                                ],
+                                "__typename": "HdoRow"
+                            },
+                            {
+                                "day": "Sobota",
+                                "intervals": [
+                                    "0:00 - 9:10",
+                                    "10:10 - 12:30",
+                                    "13:30 - 18:55",
+                                    "19:55 - 21:55",
+                                    "22:55 - 24:00"
+                                ],
+                                "__typename": "HdoRow"
+                            },
+                            {
+                                "day": "Neděle a svátky",
+                                "intervals": [
+                                    "0:00 - 9:10",
+                                    "10:10 - 12:30",
+                                    "13:30 - 18:55",
+                                    "19:55 - 21:55",
+                                    "22:55 - 24:00"
+                                ],
+                                "__typename": "HdoRow"
+                            }
+                        ],
+                        "__typename": "HdoResultPrint"
+                    }
+                ],
+                "queryDescription": "povel",
+                "__typename": "HdoResponse"
+            }
+        }
+    }
+]
+        """
+        self.fetcher = fetcher
+        self.code = code
+        self.area = area
+        self._timeout = timeout
+        self._pending = None
+        self._last_fetch = None
+        self.failures = 0
+        self.stats = HDOStats()
+        self._source = None
+        self.data = None
+        self.schedule = None
+        # bumped with every new schedule, so consumers can invalidate their caches by comparing a number
+        self.version = 0
+        self.fingerprint = None
+
+    async def async_update(self, force=False):
+        """Get the latest data, joining a fetch of the code already in flight."""
+        if self._pending is None:
+            if not force and self.data is not None and self._last_fetch is not None and \
+                    time.monotonic() - self._last_fetch < MIN_REFETCH_INTERVAL:
+                _LOGGER.debug("HDO data %s fetched less than %s s ago", self.code, MIN_REFETCH_INTERVAL)
+                self.stats.hit('throttled')
+                return
+            self._pending = asyncio.get_running_loop().create_task(self._async_fetch(force))
+            self._pending.add_done_callback(self._fetched)
+        else:
+            self.stats.hit('joined')
+        await asyncio.shield(self._pending)
+
+    def _fetched(self, _task):
+        self._pending = None
+        if not self.failures:
+            self._last_fetch = time.monotonic()
+
+    async def _async_fetch(self, force=False):
+        """Get the latest data from REST service with provided method.
+
+        A forced fetch parses and compiles the schedule even if it is unchanged.
+        """
+        _LOGGER.debug("Updating HDO data %s (%s)", self.code, self.area)
+        self.stats.fetches += 1
+        try:
+            _data, latency, size = await self.fetcher.async_fetch(self.code, self.area, self._timeout, force)
+            self.stats.latency.observe(latency)
+            self.stats.response_bytes.observe(size)
+            if not _data:
+                _LOGGER.warning("returned empty data: %s", self.code)
+                self._failed('empty', "no hdoData in the response")
+                return
+            if not force and self.data is not None and (_data is self._source or _data == self._source):
+                data = None
+            else:
+                start = time.perf_counter()
+                try:
+                    data = parse_result(_data)
+                finally:
+                    self.stats.parse_time.observe((time.perf_counter() - start) * 1000)
+                self._source = _data
+                if not force and self.data is not None and all(data[k] == self.data.get(k) for k in data):
+                    # e.g. the first fetch after restoring the same schedule from the store
+                    data = None
+
+        except CircuitOpenError as e:
+            _LOGGER.debug("Not fetching data of %s: %s", self.code, e)
+            self._failed('circuit_open', e)
+            return
+        except HDOFetchError as e:
+            _LOGGER.error("Error fetching data: %s: %s", self.code, e)
+            self._failed('fetch', e)
+            return
+        except ValueError as e:
+            _LOGGER.error("Error fetching data: %s: %s", self.code, e)
+            self._failed('invalid', e)
+            return
+
+        self.failures = 0
+        self.stats.last_success = datetime.datetime.now(datetime.timezone.utc)
+        if data is None:
+            # the schedules change a few times a year, only the bookkeeping is updated for the same one
+            _LOGGER.debug("HDO data %s unchanged", self.code)
+            self.stats.hit('unchanged')
+            self.data[LAST_UPDATE] = datetime.datetime.now()
+            return
+        data[LAST_UPDATE] = datetime.datetime.now()
+        self.data = data
+        self._update_schedule()
+
+    def _failed(self, kind, error):
+        self.failures += 1
+        self.stats.error(kind, error, datetime.datetime.now(datetime.timezone.utc))
+
+    def restore(self, cached):
+        """Use a schedule persisted by a previous run."""
+        self.data = {k: v for k, v in cached.items() if k != NEXT_DUE}
+        self.data[LAST_UPDATE] = datetime.datetime.fromisoformat(cached[LAST_UPDATE])
+        self.stats.hit('restored')
+        self._update_schedule()
+
+    def _update_schedule(self):
+        start = time.perf_counter()
+        sazby = self.data['sazby']
+        days = []
+        for day in range(DAYS_PER_WEEK):
+            days.append([(parse_minutes(t['start']), parse_minutes(t['end']))
+                         for t in sazby[_tarif_index(day, len(sazby))]['casy']])
+        self.schedule = ScheduleIndex(week_bounds(days))
+        self.data[TIMES] = self.schedule.bounds.tolist()
+        self.version += 1
+        self.fingerprint = hashlib.blake2b(self.schedule.bounds.tobytes(), digest_size=8).hexdigest()
+        self.stats.expand_time.observe((time.perf_counter() - start) * 1000)
+        _LOGGER.debug("HDO data %s: %s", self.code, self.data)
+
+    def _prepare_intervals(self, date):
+        return self.schedule.intervals(date)
+
+
+def _tarif_index(weekday, rows=DAYS_PER_WEEK):
+    if rows >= DAYS_PER_WEEK:
+        return weekday
+    return 0 if (weekday < 5) else 1
@@ -0,0 +1,28 @@
+"""Diagnostics download of the ČEZ HDO integration."""
+
+from . import entry_config
+from .const import DOMAIN, LAST_UPDATE, TIMES
+
+
+async def async_get_config_entry_diagnostics(hass, entry):
+    """Return the update statistics and the schedule state of the code of the entry."""
+    registry = hass.data[DOMAIN]
+    coordinator = registry.entries[entry.entry_id]
+    rest = coordinator.rest
+    data = coordinator.data or {}
+    return {
+        "entry": entry_config(entry),
+        "code": rest.code,
+        "area": rest.area,
+        "entries_sharing_code": sum(c is coordinator for c in registry.entries.values()),
+        "last_update_success": coordinator.last_update_success,
+        "last_exception": repr(coordinator.last_exception) if coordinator.last_exception else None,
+        "consecutive_failures": rest.failures,
+        "last_update": data[LAST_UPDATE].isoformat() if LAST_UPDATE in data else None,
+        "next_due": coordinator.next_due.isoformat() if coordinator.next_due else None,
+        "schedule_intervals": len(data.get(TIMES, ())) // 2,
+        "schedule_version": rest.version,
+        "schedule_fingerprint": rest.fingerprint,
+        "stats": rest.stats.as_dict(),
+        "fetcher": rest.fetcher.as_dict(),
+    }
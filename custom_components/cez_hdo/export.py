@@ -0,0 +1,45 @@
+"""iCalendar and JSON exports of the low tariff windows.
+
+Kept free of Home Assistant imports, so it can be benchmarked on its own.
+"""
+
+import datetime
+import json
+
+ICS_TIME = '%Y%m%dT%H%M%SZ'
+
+
+def export_windows(index, start, days):
+    """Return the (start, end) low tariff windows of the index not finished at start and starting in the days."""
+    until = start + datetime.timedelta(days=days)
+    r = []
+    for window in index.windows(start):
+        if window[0] >= until:
+            break
+        r.append(window)
+    return r
+
+
+def _utc(time):
+    return time.astimezone(datetime.timezone.utc).strftime(ICS_TIME)
+
+
+def to_ics(code, windows, stamp, summary="Nízký tarif"):
+    """Return the windows as an iCalendar with one event per window."""
+    dtstamp = _utc(stamp)
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//cez_hdo//HDO %s//CS" % code, "CALSCALE:GREGORIAN",
+             "X-WR-CALNAME:HDO %s" % code]
+    for start, end in windows:
+        begin = _utc(start)
+        lines += ["BEGIN:VEVENT", "UID:%s-%s@cez_hdo" % (code, begin), "DTSTAMP:" + dtstamp,
+                  "DTSTART:" + begin, "DTEND:" + _utc(end), "SUMMARY:" + summary, "TRANSP:TRANSPARENT",
+                  "END:VEVENT"]
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(lines) + "\r\n"
+
+
+def to_json(code, fingerprint, windows):
+    """Return the windows as compact JSON of [start, end] ISO pairs."""
+    return json.dumps({"code": code, "fingerprint": fingerprint,
+                       "windows": [[start.astimezone().isoformat(), end.astimezone().isoformat()]
+                                   for start, end in windows]}, separators=(',', ':'))
@@ -0,0 +1,79 @@
+"""Parsing of the ČEZ distribuce GraphQL responses.
+
+Kept free of Home Assistant imports, so it can be benchmarked on its own.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def loads(raw):
+    """Decode the raw response bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def batch_results(raw, count):
+    """Split a batched response into the hdoData results of its count operations.
+
+    Results missing from the response are None.
+    """
+    results = loads(raw)
+    if not isinstance(results, list):
+        raise ValueError("Unexpected HDO response: %s" % type(results).__name__)
+    r = []
+    for i in range(count):
+        try:
+            r.append(results[i]['data']['hdoData'])
+        except (IndexError, KeyError, TypeError):
+            r.append(None)
+    return r
+
+
+def parse_result(hdo_data):
+    """Validate the shape of a hdoData result once and return its parsed schedule."""
+    try:
+        result = hdo_data['resultPrint'][0]
+        return {
+            "povel": result['povel'],
+            "kod_povelu": result['kod_povelu'],
+            "description": result['description'],
+            "sazby": [parse_times(d) for d in result['rows']]
+        }
+    except (KeyError, IndexError, TypeError) as e:
+        raise ValueError("Unexpected HDO data: %r" % e) from e
+
+
+def parse_times(data):
+    """
+							{
+								"day": "Pondělí",
+								"intervals": [
+									"0:00 - 5:35",
+									"6:30 - 8:55",
+									"9:55 - 15:35",
+									"16:35 - 20:15",
+									"21:15 - 24:00"
+								],
+								"__typename": "HdoRow"
+							}
+
+    :param data:
+    :return:
+    """
+    r = []
+    for i in data['intervals']:
+        s = i.split(" - ")
+        if len(s) > 1:
+            r.append({'start': s[0], 'end': s[1]})
+
+    return {
+        "id": data["day"],
+        "platnost": data["day"],
+        "casy": r
+    }
@@ -0,0 +1,29 @@
+"""Summaries of cProfile runs of the update path.
+
+Kept free of Home Assistant imports; write_profile does blocking I/O and
+belongs in the executor.
+"""
+
+import os
+import pstats
+
+
+def top_functions(stats, count=20):
+    """Return the count functions with the highest own time of the pstats.Stats."""
+    rows = []
+    for (filename, line, name), (_cc, calls, own, cumulative, _callers) in stats.stats.items():
+        rows.append({
+            "function": "%s:%d(%s)" % (os.path.basename(filename), line, name) if line else name,
+            "calls": calls,
+            "own_ms": round(own * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3),
+        })
+    rows.sort(key=lambda r: r["own_ms"], reverse=True)
+    return rows[:count]
+
+
+def write_profile(profiler, path, count=20):
+    """Dump the disabled cProfile.Profile to the pstats file and return its top functions."""
+    stats = pstats.Stats(profiler)
+    stats.dump_stats(path)
+    return top_functions(stats, count)
@@ -0,0 +1,380 @@
+"""Precompiled HDO schedule index.
+
+Kept free of Home Assistant imports, so it can be benchmarked on its own.
+"""
+
+import datetime
+import itertools
+from array import array
+from bisect import bisect_left, bisect_right
+from string import Formatter
+
+MINUTES_PER_DAY = 24 * 60
+DAYS_PER_WEEK = 7
+MINUTES_PER_WEEK = DAYS_PER_WEEK * MINUTES_PER_DAY
+# "Neděle a svátky", the day of the week whose intervals apply on public holidays
+HOLIDAY_ROW = DAYS_PER_WEEK - 1
+# Czech public holidays with a fixed date, as (month, day)
+FIXED_HOLIDAYS = ((1, 1), (5, 1), (5, 8), (7, 5), (7, 6), (9, 28), (10, 28), (11, 17), (12, 24), (12, 25), (12, 26))
+# days ahead of and past a seasonal schedule change refreshed more often
+SEASON_BEFORE = 3
+SEASON_AFTER = 1
+
+
+def parse_minutes(text):
+    """Return the minute of the day of a 'H:MM' time, '24:00' being the end of the day."""
+    hours, minutes = text.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def week_bounds(days):
+    """Return the minute-of-week boundaries of seven days of (start, end) minute-of-day intervals."""
+    bounds = array('H')
+    for day, intervals in enumerate(days):
+        base = day * MINUTES_PER_DAY
+        day_start = len(bounds)
+        for start, end in sorted(intervals):
+            if end < start:
+                end = MINUTES_PER_DAY
+            if end == start:
+                continue
+            if len(bounds) > day_start and base + start <= bounds[-1]:
+                bounds[-1] = max(bounds[-1], base + end)
+            else:
+                bounds.append(base + start)
+                bounds.append(base + end)
+    return bounds
+
+
+def easter(year):
+    """Return the Easter Sunday of the year (anonymous Gregorian algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return datetime.date(year, month, day + 1)
+
+
+def czech_holidays(year):
+    """Return the dates of the Czech public holidays of the year."""
+    sunday = easter(year)
+    holidays = {datetime.date(year, month, day) for month, day in FIXED_HOLIDAYS}
+    holidays.add(sunday - datetime.timedelta(days=2))
+    holidays.add(sunday + datetime.timedelta(days=1))
+    return holidays
+
+
+def last_sunday(year, month):
+    """Return the last Sunday of the month."""
+    last = datetime.date(year + month // 12, month % 12 + 1, 1) - datetime.timedelta(days=1)
+    return last - datetime.timedelta(days=(last.weekday() + 1) % 7)
+
+
+def seasonal_changes(year):
+    """Return the dates the HDO schedules usually change on: the new year and the daylight saving time switches."""
+    return datetime.date(year, 1, 1), last_sunday(year, 3), last_sunday(year, 10)
+
+
+def near_seasonal_change(date, before=SEASON_BEFORE, after=SEASON_AFTER):
+    """Return True if the date is up to before days ahead of or after days past a seasonal change."""
+    for year in (date.year - 1, date.year, date.year + 1):
+        for change in seasonal_changes(year):
+            if -after <= (change - date).days <= before:
+                return True
+    return False
+
+
+def next_seasonal_window(date, before=SEASON_BEFORE):
+    """Return the first day after the date opening the window ahead of a seasonal change."""
+    return min(change - datetime.timedelta(days=before)
+               for year in (date.year, date.year + 1) for change in seasonal_changes(year)
+               if change - datetime.timedelta(days=before) > date)
+
+
+class HolidayCalendar(object):
+    """Precomputed day of the week timeline used on every date of the current and the next year.
+
+    Working days use their own weekday, public holidays use the Sunday. The
+    table is built on first use and rebuilt only when a date past its end is
+    looked up, i.e. once the second year of the table is over.
+    """
+
+    def __init__(self):
+        """Initialize the calendar."""
+        self._first = None
+        self._end = None
+        self._rows = None
+
+    def _build(self, year):
+        first = datetime.date(year, 1, 1)
+        holidays = czech_holidays(year) | czech_holidays(year + 1)
+        rows = array('B')
+        date = first
+        while date.year <= year + 1:
+            rows.append(HOLIDAY_ROW if date in holidays else date.weekday())
+            date += datetime.timedelta(days=1)
+        self._first = first.toordinal()
+        self._end = datetime.date(year + 2, 1, 1).toordinal()
+        self._rows = rows
+
+    def row(self, ordinal):
+        """Return the day of the week timeline used for the proleptic Gregorian ordinal."""
+        if self._rows is None or ordinal >= self._end:
+            self._build(datetime.date.fromordinal(ordinal).year)
+        i = ordinal - self._first
+        if i >= 0:
+            return self._rows[i]
+        date = datetime.date.fromordinal(ordinal)
+        return HOLIDAY_ROW if date in czech_holidays(date.year) else date.weekday()
+
+
+CALENDAR = HolidayCalendar()
+
+
+class ScheduleIndex(object):
+    """Weekly low tariff timeline answering the schedule queries by binary search.
+
+    The timeline is a compact array of minute-of-week boundaries, Monday 0:00
+    being 0. Boundaries at even positions switch the low tariff on, boundaries
+    at odd positions switch it off. Datetimes are only produced on demand.
+    Public holidays follow the Sunday of the timeline.
+    """
+
+    def __init__(self, bounds, calendar=CALENDAR):
+        """Build the index from minute-of-week boundaries."""
+        self._bounds = array('H', bounds)
+        self._calendar = calendar
+        counts = [0] * DAYS_PER_WEEK
+        for j, minute in enumerate(self._bounds):
+            # an end at midnight belongs to the day before
+            counts[(minute - j % 2) // MINUTES_PER_DAY] += 1
+        self._offsets = array('H', [0])
+        for count in counts:
+            self._offsets.append(self._offsets[-1] + count)
+
+    def __len__(self):
+        return len(self._bounds) // 2
+
+    @property
+    def bounds(self):
+        """Return the minute-of-week boundaries."""
+        return self._bounds
+
+    def _row(self, ordinal):
+        """Return the day of the timeline used for the proleptic Gregorian ordinal."""
+        return self._calendar.row(ordinal)
+
+    def _day(self, date):
+        day = self._row(date.toordinal())
+        return day * MINUTES_PER_DAY, self._offsets[day], self._offsets[day + 1]
+
+    def is_on(self, time):
+        """Return True if the low tariff is active at the time."""
+        base, lo, hi = self._day(time)
+        minute = base + time.hour * 60 + time.minute + (time.second + time.microsecond / 1e6) / 60
+        return (bisect_right(self._bounds, minute, lo, hi) - lo) % 2 == 1
+
+    def intervals(self, date):
+        """Return the (start, end) datetimes of the low tariff intervals of the date."""
+        base, lo, hi = self._day(date)
+        midnight = datetime.datetime.combine(date, datetime.time())
+        b = self._bounds
+        return [(midnight + datetime.timedelta(minutes=b[j] - base),
+                 midnight + datetime.timedelta(minutes=b[j + 1] - base)) for j in range(lo, hi, 2)]
+
+    def _carry(self, ordinal):
+        """Return the minutes of low tariff running without a break into the midnight starting the day."""
+        b = self._bounds
+        carry = 0
+        for _ in range(DAYS_PER_WEEK):
+            ordinal -= 1
+            day = self._row(ordinal)
+            lo, hi = self._offsets[day], self._offsets[day + 1]
+            if lo == hi or b[hi - 1] != (day + 1) * MINUTES_PER_DAY:
+                break
+            carry += b[hi - 1] - b[hi - 2]
+            if b[hi - 2] != day * MINUTES_PER_DAY:
+                break
+        return carry
+
+    def windows(self, time, days=None):
+        """Lazily yield the (start, end) low tariff windows not finished at the time.
+
+        Intervals touching over midnight are merged into one window, so every
+        yielded start and end is a real tariff switch. Without a number of days
+        the windows go on for ever, so take only as many as needed.
+        """
+        if not self._bounds:
+            return
+        b = self._bounds
+        offsets = self._offsets
+        midnight = datetime.datetime.combine(time.date(), datetime.time())
+        ordinal = midnight.toordinal()
+        base, lo, hi = self._day(time)
+        minute = base + time.hour * 60 + time.minute + (time.second + time.microsecond / 1e6) / 60
+        first = bisect_right(b, minute, lo, hi)
+        first -= (first - lo) % 2
+        start = end = None
+        for day in (itertools.count() if days is None else range(days + 1)):
+            if end is not None and end - start > MINUTES_PER_WEEK:
+                # low tariff all the time, the window would never end
+                break
+            row = self._row(ordinal + day)
+            shift = (day - row) * MINUTES_PER_DAY
+            for k in range(first if day == 0 else offsets[row], offsets[row + 1], 2):
+                s, e = b[k] + shift, b[k + 1] + shift
+                if end is not None and s <= end:
+                    end = e
+                    continue
+                if end is not None:
+                    yield midnight + datetime.timedelta(minutes=start), midnight + datetime.timedelta(minutes=end)
+                elif s == 0:
+                    # the window in progress may have started before the midnight
+                    s -= self._carry(ordinal)
+                start, end = s, e
+        if end is not None:
+            yield midnight + datetime.timedelta(minutes=start), midnight + datetime.timedelta(minutes=end)
+
+    def find_next(self, time):
+        """Return the first tariff switch after the time or None."""
+        window = next(self.windows(time), None)
+        if window is None:
+            return None
+        if window[0] > time:
+            return window[0]
+        if window[1] - window[0] > datetime.timedelta(minutes=MINUTES_PER_WEEK):
+            # low tariff all the time, the end of the window is not a switch
+            return None
+        return window[1]
+
+    def following(self, time, max_count):
+        """Return up to max_count (start, end) windows not finished at the time."""
+        return list(itertools.islice(self.windows(time), max_count))
+
+    def best_windows(self, time, until, duration, count=1, min_minutes=0):
+        """Return up to count non-overlapping (start, end, low tariff minutes) windows of the duration.
+
+        The windows lie between the time and until, the ones with the most low
+        tariff first. Windows without any low tariff are left out.
+
+        The low tariff minutes of a sliding window only change their slope when
+        an edge of the window crosses a switch, so the best windows start at a
+        switch on or end at a switch off. Only those candidates are evaluated,
+        each by two binary searches over prefix sums of the windows. The windows
+        are picked one by one, the next one may also end or start right at one
+        already picked.
+        """
+        length = (until - time).total_seconds() / 60
+        span = duration.total_seconds() / 60
+        if span <= 0 or span > length:
+            return []
+        starts, ends, prefix = [], [], [0.0]
+        for start, end in self.windows(time):
+            if start >= until:
+                break
+            if end - start > datetime.timedelta(minutes=MINUTES_PER_WEEK):
+                # low tariff all the time
+                end = until
+            s = max(0.0, (start - time).total_seconds() / 60)
+            e = min(length, (end - time).total_seconds() / 60)
+            starts.append(s)
+            ends.append(e)
+            prefix.append(prefix[-1] + e - s)
+
+        def low(a, b):
+            i = bisect_right(ends, a)
+            j = bisect_left(starts, b, i)
+            if i >= j:
+                return 0.0
+            return prefix[j] - prefix[i] - max(0.0, a - starts[i]) - max(0.0, ends[j - 1] - b)
+
+        def free(c):
+            return all(c + span <= b + 1e-9 or c >= b + span - 1e-9 for _m, b in best)
+
+        switches = {s for s in starts if s + span <= length}
+        candidates = switches | {e - span for e in ends if e >= span} | {0.0, length - span}
+        best = []
+        while len(best) < count:
+            # among equal windows the ones starting with the low tariff, then the earlier ones
+            scored = [(low(c, c + span), c) for c in candidates if free(c)]
+            if not scored:
+                break
+            minutes, c = max(scored, key=lambda t: (t[0], t[1] in switches, -t[1]))
+            if minutes <= 0 or minutes < min_minutes:
+                break
+            best.append((minutes, c))
+            # the best window not overlapping the picked ones may also end or start right at them
+            candidates.update(p for p in (c - span, c + span) if 0 <= p <= length - span)
+        return [(time + datetime.timedelta(minutes=c), time + datetime.timedelta(minutes=c + span), minutes)
+                for minutes, c in best]
+
+    def on_minutes(self, time, *untils):
+        """Return the minutes of low tariff from the time till each of the untils, walking the windows once."""
+        totals = [0.0] * len(untils)
+        last = max(untils)
+        for start, end in self.windows(time):
+            if start >= last:
+                break
+            if end - start > datetime.timedelta(minutes=MINUTES_PER_WEEK):
+                # low tariff all the time
+                end = last
+            start = max(start, time)
+            for i, until in enumerate(untils):
+                if start < until:
+                    totals[i] += (min(end, until) - start).total_seconds() / 60
+        return totals
+
+
+def strfdelta(tdelta, fmt='{D:02}d {H:02}h {M:02}m {S:02}s',
+              inputtype='timedelta'):
+    """Convert a datetime.timedelta object or a regular number to a custom-
+    formatted string, just like the stftime() method does for datetime.datetime
+    objects.
+
+    The fmt argument allows custom formatting to be specified.  Fields can
+    include seconds, minutes, hours, days, and weeks.  Each field is optional.
+
+    Some examples:
+        '{D:02}d {H:02}h {M:02}m {S:02}s' --> '05d 08h 04m 02s' (default)
+        '{W}w {D}d {H}:{M:02}:{S:02}'     --> '4w 5d 8:04:02'
+        '{D:2}d {H:2}:{M:02}:{S:02}'      --> ' 5d  8:04:02'
+        '{H}h {S}s'                       --> '72h 800s'
+
+    The inputtype argument allows tdelta to be a regular number instead of the
+    default, which is a datetime.timedelta object.  Valid inputtype strings:
+        's', 'seconds',
+        'm', 'minutes',
+        'h', 'hours',
+        'd', 'days',
+        'w', 'weeks'
+    """
+
+    # Convert tdelta to integer seconds.
+    if inputtype == 'timedelta':
+        remainder = int(tdelta.total_seconds())
+    elif inputtype in ['s', 'seconds']:
+        remainder = int(tdelta)
+    elif inputtype in ['m', 'minutes']:
+        remainder = int(tdelta) * 60
+    elif inputtype in ['h', 'hours']:
+        remainder = int(tdelta) * 3600
+    elif inputtype in ['d', 'days']:
+        remainder = int(tdelta) * 86400
+    elif inputtype in ['w', 'weeks']:
+        remainder = int(tdelta) * 604800
+
+    f = Formatter()
+    desired_fields = [field_tuple[1] for field_tuple in f.parse(fmt)]
+    possible_fields = ('W', 'D', 'H', 'M', 'S')
+    constants = {'W': 604800, 'D': 86400, 'H': 3600, 'M': 60, 'S': 1}
+    values = {}
+    for field in possible_fields:
+        if field in desired_fields and field in constants:
+            values[field], remainder = divmod(remainder, constants[field])
+    return f.format(fmt, **values)
@@ -0,0 +1,116 @@
+"""
+Sensors derived from the shared schedule of a code: the next tariff switch, low
+tariff minutes left today and the low tariff share of the next 24 hours.
+
+Diagnostic sensors of the updates: fetch latency, payload size, parse and
+expansion time, errors and the last successful fetch. They are disabled by default.
+"""
+
+from homeassistant.components.sensor import (SensorDeviceClass, SensorEntity, SensorEntityDescription,
+                                             SensorStateClass)
+from homeassistant.const import CONF_CODE, CONF_NAME, PERCENTAGE, EntityCategory, UnitOfInformation, UnitOfTime
+from homeassistant.core import callback
+from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from . import async_get_version, entry_config, unique_id
+from .const import DOMAIN, DEFAULT_NAME
+
+SCHEDULE = (
+    (SensorEntityDescription(key="next_switch", name="next switch", device_class=SensorDeviceClass.TIMESTAMP),
+     lambda coordinator: coordinator.next_switch),
+    (SensorEntityDescription(key="low_tariff_today", name="low tariff left today",
+                             device_class=SensorDeviceClass.DURATION, native_unit_of_measurement=UnitOfTime.MINUTES,
+                             state_class=SensorStateClass.MEASUREMENT),
+     lambda coordinator: coordinator.low_minutes_today),
+    (SensorEntityDescription(key="low_tariff_share_24h", name="low tariff share 24h",
+                             native_unit_of_measurement=PERCENTAGE, state_class=SensorStateClass.MEASUREMENT),
+     lambda coordinator: coordinator.low_share_24h),
+)
+
+DIAGNOSTICS = (
+    (SensorEntityDescription(key="latency", name="fetch latency", device_class=SensorDeviceClass.DURATION,
+                             native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+                             state_class=SensorStateClass.MEASUREMENT, suggested_display_precision=0),
+     lambda coordinator: coordinator.rest.stats.latency.last),
+    (SensorEntityDescription(key="response_bytes", name="response size", device_class=SensorDeviceClass.DATA_SIZE,
+                             native_unit_of_measurement=UnitOfInformation.BYTES,
+                             state_class=SensorStateClass.MEASUREMENT),
+     lambda coordinator: coordinator.rest.stats.response_bytes.last),
+    (SensorEntityDescription(key="parse_time", name="parse time", device_class=SensorDeviceClass.DURATION,
+                             native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+                             state_class=SensorStateClass.MEASUREMENT, suggested_display_precision=2),
+     lambda coordinator: coordinator.rest.stats.parse_time.last),
+    (SensorEntityDescription(key="expand_time", name="expansion time", device_class=SensorDeviceClass.DURATION,
+                             native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+                             state_class=SensorStateClass.MEASUREMENT, suggested_display_precision=2),
+     lambda coordinator: coordinator.rest.stats.expand_time.last),
+    (SensorEntityDescription(key="errors", name="errors", state_class=SensorStateClass.TOTAL_INCREASING),
+     lambda coordinator: coordinator.rest.stats.error_count),
+    (SensorEntityDescription(key="last_success", name="last success", device_class=SensorDeviceClass.TIMESTAMP),
+     lambda coordinator: coordinator.rest.stats.last_success),
+)
+
+
+async def async_setup_entry(hass, entry, async_add_entities):
+    """Set up the schedule and diagnostic sensors of a config entry."""
+    config = entry_config(entry)
+    coordinator = hass.data[DOMAIN].entries[entry.entry_id]
+    version = await async_get_version(hass)
+    name = config.get(CONF_NAME, DEFAULT_NAME)
+    code = config.get(CONF_CODE)
+    async_add_entities([HDOSensor(coordinator, name, code, description, value, version)
+                        for description, value in SCHEDULE] +
+                       [HDODiagnosticSensor(coordinator, name, code, description, value, version)
+                        for description, value in DIAGNOSTICS])
+
+
+class HDOSensor(CoordinatorEntity, SensorEntity):
+    """Sensor exposing one value of the snapshot the coordinator takes at every tariff switch."""
+
+    def __init__(self, coordinator, name, code, description, value, version=None):
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._value = value
+        self._attr_name = "%s %s" % (name, description.name)
+        uid = unique_id(code, coordinator.rest.area)
+        self._attr_unique_id = "%s_%s" % (uid, description.key)
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, uid)},
+            name=name,
+            sw_version=version,
+            model="REST call",
+            manufacturer="ČEZ distribuce",
+        )
+        self._written = None
+
+    @property
+    def available(self):
+        """Return True once the schedule of the code is known."""
+        return self.coordinator.schedule is not None
+
+    @property
+    def native_value(self):
+        """Return the current value."""
+        return self._value(self.coordinator)
+
+    @callback
+    def _handle_coordinator_update(self):
+        """Write the state only if the value or the availability changed."""
+        written = (self.available, self.native_value)
+        if written != self._written:
+            self._written = written
+            self.async_write_ha_state()
+
+
+class HDODiagnosticSensor(HDOSensor):
+    """Sensor exposing one statistic of the updates of a code."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    @property
+    def available(self):
+        """Statistics are available even when the last update failed."""
+        return True
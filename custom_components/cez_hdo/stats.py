@@ -0,0 +1,94 @@
+"""Counters and histograms of the update path of one code.
+
+Kept free of Home Assistant imports, so it can be benchmarked on its own.
+"""
+
+import bisect
+
+# upper bounds of the histogram buckets, the last bucket is unbounded
+MS_BUCKETS = (1, 5, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class Histogram(object):
+    """Fixed bucket histogram remembering the last, minimal and maximal observed value."""
+
+    __slots__ = ('_bounds', '_counts', 'count', 'total', 'last', 'min', 'max')
+
+    def __init__(self, bounds):
+        """Initialize the histogram with the upper bounds of its buckets."""
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0
+        self.last = None
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        """Add the value to the histogram."""
+        self._counts[bisect.bisect_left(self._bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.last = value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def mean(self):
+        """Return the mean of the observed values."""
+        return self.total / self.count if self.count else None
+
+    def as_dict(self):
+        """Return the histogram as a JSON serializable dict."""
+        buckets = {"le_%s" % b: c for b, c in zip(self._bounds, self._counts)}
+        buckets["inf"] = self._counts[-1]
+        return {"count": self.count, "last": self.last, "min": self.min, "max": self.max, "mean": self.mean,
+                "buckets": buckets}
+
+
+class HDOStats(object):
+    """Instrumentation of fetching and compiling the schedule of one code."""
+
+    def __init__(self):
+        """Initialize empty statistics."""
+        self.latency = Histogram(MS_BUCKETS)
+        self.response_bytes = Histogram(BYTES_BUCKETS)
+        self.parse_time = Histogram(MS_BUCKETS)
+        self.expand_time = Histogram(MS_BUCKETS)
+        self.fetches = 0
+        self.errors = {}
+        self.cache_hits = {}
+        self.last_success = None
+        self.last_error = None
+        self.last_error_time = None
+
+    @property
+    def error_count(self):
+        """Return the number of failed fetches of any kind."""
+        return sum(self.errors.values())
+
+    def error(self, kind, message, now):
+        """Count a failed fetch of the kind."""
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+        self.last_error = "%s: %s" % (kind, message)
+        self.last_error_time = now
+
+    def hit(self, kind):
+        """Count an update served without a request of its own."""
+        self.cache_hits[kind] = self.cache_hits.get(kind, 0) + 1
+
+    def as_dict(self):
+        """Return the statistics as a JSON serializable dict."""
+        return {
+            "fetches": self.fetches,
+            "errors": dict(self.errors),
+            "cache_hits": dict(self.cache_hits),
+            "last_success": self.last_success.isoformat() if self.last_success else None,
+            "last_error": self.last_error,
+            "last_error_time": self.last_error_time.isoformat() if self.last_error_time else None,
+            "latency_ms": self.latency.as_dict(),
+            "response_bytes": self.response_bytes.as_dict(),
+            "parse_ms": self.parse_time.as_dict(),
+            "expand_ms": self.expand_time.as_dict(),
+        }
@@ -0,0 +1,75 @@
+"""HTTP export of the low tariff windows of a code as iCalendar or JSON.
+
+    GET /api/cez_hdo/<code>.ics?days=7
+    GET /api/cez_hdo/<code>.json?days=7&area=stred
+
+The body only depends on the schedule and the current day, so it is
+rendered once per schedule and day and then answered from memory,
+or with 304 Not Modified for a matching If-None-Match.
+"""
+
+import datetime
+import hashlib
+from http import HTTPStatus
+
+from aiohttp import web
+from homeassistant.components.http import HomeAssistantView
+
+from .const import DOMAIN, CONF_AREA
+from .export import export_windows, to_ics, to_json
+
+DEFAULT_DAYS = 7
+MAX_DAYS = 31
+MAX_AGE = 300
+CONTENT_TYPES = {'ics': 'text/calendar', 'json': 'application/json'}
+
+
+class HDOScheduleView(HomeAssistantView):
+    """View serving the low tariff windows of a code."""
+
+    url = '/api/%s/{code}.{fmt:(ics|json)}' % DOMAIN
+    name = 'api:%s:schedule' % DOMAIN
+
+    def __init__(self, hass):
+        """Initialize the view."""
+        self._hass = hass
+        self._cache = {}
+
+    async def get(self, request, code, fmt):
+        """Return the windows of the code in the format."""
+        try:
+            days = int(request.query.get('days', DEFAULT_DAYS))
+        except ValueError:
+            return self.json_message("days must be a number", HTTPStatus.BAD_REQUEST)
+        if not 1 <= days <= MAX_DAYS:
+            return self.json_message("days must be between 1 and %d" % MAX_DAYS, HTTPStatus.BAD_REQUEST)
+        registry = self._hass.data.get(DOMAIN)
+        coordinators = registry.find(code, request.query.get(CONF_AREA)) if registry else []
+        coordinators = [c for c in coordinators if c.schedule]
+        if not coordinators:
+            return self.json_message("No HDO schedule for code %s" % code, HTTPStatus.NOT_FOUND)
+        if len(coordinators) > 1:
+            return self.json_message("Code %s is configured in several areas, choose one by area" % code,
+                                     HTTPStatus.BAD_REQUEST)
+        rest = coordinators[0].rest
+
+        today = datetime.date.today()
+        key = (rest.code, rest.area, fmt, days)
+        token = (rest.fingerprint, today)
+        cached = self._cache.get(key)
+        if cached is None or cached[0] != token:
+            etag = '"%s"' % hashlib.blake2b(repr((key, token)).encode(), digest_size=8).hexdigest()
+            midnight = datetime.datetime.combine(today, datetime.time())
+            windows = export_windows(rest.schedule, midnight, days)
+            # the body must be the same for the same ETag, even after a restart
+            if fmt == 'ics':
+                body = to_ics(rest.code, windows, midnight.astimezone())
+            else:
+                body = to_json(rest.code, rest.fingerprint, windows)
+            cached = self._cache[key] = (token, etag, body.encode('UTF-8'))
+
+        _token, etag, body = cached
+        headers = {'ETag': etag, 'Cache-Control': 'private, max-age=%d' % MAX_AGE}
+        if etag in (t.strip().removeprefix('W/') for t in request.headers.get('If-None-Match', '').split(',')):
+            return web.Response(status=HTTPStatus.NOT_MODIFIED, headers=headers)
+        return web.Response(body=body, content_type=CONTENT_TYPES[fmt], charset='utf-8', headers=headers)
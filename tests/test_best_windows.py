@@ -0,0 +1,64 @@
+"""ScheduleIndex.best_windows against a minute by minute brute force on random schedules."""
+
+import datetime
+import importlib.util
+import os
+import random
+
+import pytest
+
+COMPONENT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'custom_components', 'cez_hdo')
+NOW = datetime.datetime(2024, 1, 3, 12, 0)
+DAYS = 3
+
+
+def _load(name):
+    spec = importlib.util.spec_from_file_location('cez_hdo_' + name, os.path.join(COMPONENT, name + '.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+schedule = _load('schedule')
+
+
+def random_index(rnd):
+    days = []
+    for _ in range(schedule.DAYS_PER_WEEK):
+        points = sorted(rnd.sample(range(schedule.MINUTES_PER_DAY + 1), 2 * rnd.randint(0, 4)))
+        days.append([(points[k], points[k + 1]) for k in range(0, len(points), 2)])
+    return schedule.ScheduleIndex(schedule.week_bounds(days))
+
+
+def brute_best(on, span, picked):
+    """Return the most low tariff minutes of a window of span minutes not overlapping the picked starts."""
+    best = 0
+    for t in range(len(on) - span + 1):
+        if all(t + span <= b or t >= b + span for b in picked):
+            best = max(best, sum(on[t:t + span]))
+    return best
+
+
+@pytest.mark.parametrize('seed', range(60))
+def test_best_windows_match_brute_force(seed):
+    rnd = random.Random(seed)
+    index = random_index(rnd)
+    span = rnd.randint(10, 600)
+    on = [index.is_on(NOW + datetime.timedelta(minutes=m, seconds=30)) for m in range(DAYS * 1440)]
+    windows = index.best_windows(NOW, NOW + datetime.timedelta(days=DAYS), datetime.timedelta(minutes=span), 3)
+
+    picked = []
+    for start, end, minutes in windows:
+        assert end - start == datetime.timedelta(minutes=span)
+        assert minutes == pytest.approx(brute_best(on, span, picked))
+        picked.append(round((start - NOW).total_seconds() / 60))
+    if len(windows) < 3:
+        assert brute_best(on, span, picked) == 0
+
+
+def test_next_window_may_touch_a_picked_one():
+    # low tariff 0:00-8:00 every day, the second best 4 h window follows the first one
+    index = schedule.ScheduleIndex(schedule.week_bounds([[(0, 480)]] * schedule.DAYS_PER_WEEK))
+    midnight = datetime.datetime(2024, 1, 3)
+    windows = index.best_windows(midnight, midnight + datetime.timedelta(hours=12), datetime.timedelta(hours=4), 2)
+    assert [(w[0].hour, w[1].hour, w[2]) for w in windows] == [(0, 4, 240), (4, 8, 240)]
@@ -0,0 +1,177 @@
+"""ScheduleIndex queries against a minute by minute timeline of random schedules, holidays included."""
+
+import datetime
+import importlib.util
+import os
+import random
+
+import pytest
+
+COMPONENT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'custom_components', 'cez_hdo')
+DAYS = 10
+# the timeline starts early enough to hold a window carried over from the days before
+BEFORE = 8
+
+
+def _load(name):
+    spec = importlib.util.spec_from_file_location('cez_hdo_' + name, os.path.join(COMPONENT, name + '.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+schedule = _load('schedule')
+
+
+def random_days(rnd):
+    """Return seven days of intervals, often starting at or ending with the midnight."""
+    days = []
+    for _ in range(schedule.DAYS_PER_WEEK):
+        points = sorted(rnd.sample(range(1, schedule.MINUTES_PER_DAY), 2 * rnd.randint(0, 3)))
+        if rnd.random() < 0.5:
+            points = [0, rnd.randint(1, points[0] if points else schedule.MINUTES_PER_DAY)] + points
+        if rnd.random() < 0.5:
+            points += [rnd.randint(points[-1] if points else 0, schedule.MINUTES_PER_DAY - 1),
+                       schedule.MINUTES_PER_DAY]
+        days.append([(points[k], points[k + 1]) for k in range(0, len(points), 2)])
+    return days
+
+
+def timeline(days, first, count):
+    """Return the low tariff state of every minute of the count days from the first date."""
+    rows = []
+    for intervals in days:
+        row = [False] * schedule.MINUTES_PER_DAY
+        for start, end in intervals:
+            row[start:end] = [True] * (end - start)
+        rows.append(row)
+    on = []
+    for day in range(count):
+        date = first + datetime.timedelta(days=day)
+        holiday = date in schedule.czech_holidays(date.year)
+        on += rows[schedule.HOLIDAY_ROW if holiday else date.weekday()]
+    return on
+
+
+def runs(on):
+    """Return the (start, end) minutes of the low tariff runs of the timeline."""
+    r = []
+    start = None
+    for minute, state in enumerate(on + [False]):
+        if state and start is None:
+            start = minute
+        elif not state and start is not None:
+            r.append((start, minute))
+            start = None
+    return r
+
+
+def case(seed):
+    """Return the index, its timeline starting at origin and a random time within the tested days."""
+    rnd = random.Random(seed)
+    days = random_days(rnd)
+    # years around the table of the holiday calendar, Easter included
+    start = datetime.date(2024, 1, 1) + datetime.timedelta(days=rnd.randint(0, 3 * 365))
+    if seed % 4 == 0:
+        start = schedule.easter(start.year) - datetime.timedelta(days=rnd.randint(0, 4))
+    origin = datetime.datetime.combine(start - datetime.timedelta(days=BEFORE), datetime.time())
+    on = timeline(days, origin.date(), BEFORE + DAYS + BEFORE)
+    time = datetime.datetime.combine(start, datetime.time()) + datetime.timedelta(
+        minutes=rnd.randrange(schedule.MINUTES_PER_DAY), seconds=rnd.choice((0, 30)))
+    return schedule.ScheduleIndex(schedule.week_bounds(days)), on, origin, time, rnd
+
+
+def minutes(origin, time):
+    return (time - origin).total_seconds() / 60
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_is_on_matches_timeline(seed):
+    index, on, origin, _time, rnd = case(seed)
+    for _ in range(200):
+        m = rnd.randrange(BEFORE * schedule.MINUTES_PER_DAY, (BEFORE + DAYS) * schedule.MINUTES_PER_DAY)
+        time = origin + datetime.timedelta(minutes=m, seconds=rnd.randrange(60))
+        assert index.is_on(time) == on[m], time
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_windows_match_timeline(seed):
+    index, on, origin, time, _rnd = case(seed)
+    now = minutes(origin, time)
+    until = (BEFORE + DAYS) * schedule.MINUTES_PER_DAY
+    expected = [(s, e) for s, e in runs(on) if e > now and s < until]
+    assert all(e - s <= schedule.MINUTES_PER_WEEK for s, e in expected)
+    got = []
+    for start, end in index.windows(time):
+        if minutes(origin, start) >= until:
+            break
+        got.append((minutes(origin, start), minutes(origin, end)))
+    assert got == expected
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_find_next_matches_timeline(seed):
+    index, on, origin, time, _rnd = case(seed)
+    m = int(minutes(origin, time))
+    switch = next((k for k in range(m + 1, len(on)) if on[k] != on[k - 1]), None)
+    expected = origin + datetime.timedelta(minutes=switch) if switch is not None else None
+    assert index.find_next(time) == expected
+
+
+def test_window_in_progress_is_carried_over_the_midnights():
+    # low tariff from Friday 20:00 over the whole weekend till Monday 6:00
+    days = [[(0, 360)], [], [], [], [(1200, 1440)], [(0, 1440)], [(0, 1440)]]
+    index = schedule.ScheduleIndex(schedule.week_bounds(days))
+    sunday = datetime.datetime(2024, 1, 7, 12, 0)
+    assert next(index.windows(sunday)) == (datetime.datetime(2024, 1, 5, 20, 0), datetime.datetime(2024, 1, 8, 6, 0))
+    assert index.find_next(sunday) == datetime.datetime(2024, 1, 8, 6, 0)
+
+
+def test_find_next_without_switches():
+    time = datetime.datetime(2024, 1, 3, 12, 0)
+    always = schedule.ScheduleIndex(schedule.week_bounds([[(0, schedule.MINUTES_PER_DAY)]] * schedule.DAYS_PER_WEEK))
+    never = schedule.ScheduleIndex(schedule.week_bounds([[]] * schedule.DAYS_PER_WEEK))
+    assert always.is_on(time)
+    assert always.find_next(time) is None
+    assert never.find_next(time) is None
+
+
+@pytest.mark.parametrize('year, sunday', [(2024, datetime.date(2024, 3, 31)), (2025, datetime.date(2025, 4, 20)),
+                                          (2026, datetime.date(2026, 4, 5)), (2038, datetime.date(2038, 4, 25))])
+def test_easter(year, sunday):
+    assert schedule.easter(year) == sunday
+
+
+def test_easter_holidays_use_the_sunday():
+    assert {datetime.date(2024, 3, 29), datetime.date(2024, 4, 1)} <= schedule.czech_holidays(2024)
+    # low tariff only on Sundays, Good Friday and Easter Monday included
+    days = [[]] * (schedule.DAYS_PER_WEEK - 1) + [[(0, schedule.MINUTES_PER_DAY)]]
+    index = schedule.ScheduleIndex(schedule.week_bounds(days), schedule.HolidayCalendar())
+    assert not index.is_on(datetime.datetime(2024, 3, 28, 12, 0))
+    assert index.is_on(datetime.datetime(2024, 3, 29, 12, 0))
+    assert not index.is_on(datetime.datetime(2024, 3, 30, 12, 0))
+    assert index.is_on(datetime.datetime(2024, 4, 1, 12, 0))
+    assert index.find_next(datetime.datetime(2024, 3, 29, 12, 0)) == datetime.datetime(2024, 3, 30, 0, 0)
+
+
+def expected_row(date):
+    return schedule.HOLIDAY_ROW if date in schedule.czech_holidays(date.year) else date.weekday()
+
+
+def test_holiday_calendar_past_and_before_its_table():
+    calendar = schedule.HolidayCalendar()
+    first = datetime.date(2024, 6, 1)
+    # every day of the table, then past its end and back before its new start
+    dates = [first + datetime.timedelta(days=k) for k in range(700)]
+    dates += [datetime.date(2026, 4, 6), datetime.date(2027, 12, 24), datetime.date(2024, 5, 1),
+              datetime.date(2023, 12, 25), datetime.date(2025, 4, 21)]
+    for date in dates:
+        assert calendar.row(date.toordinal()) == expected_row(date), date
+
+
+def test_holiday_calendar_in_random_order():
+    calendar = schedule.HolidayCalendar()
+    rnd = random.Random(0)
+    for _ in range(2000):
+        date = datetime.date(2020, 1, 1) + datetime.timedelta(days=rnd.randrange(12 * 365))
+        assert calendar.row(date.toordinal()) == expected_row(date), date